@@ -3,7 +3,15 @@ from .calibration import Calibration
 from .cameracalibration import CameraCalibration
 from .projectorcalibration import ProjectorCalibration
 from .fullscreenshow import FullscreenShow
+from .projectorcanvas import ProjectorCanvas
+from .markertracker import MarkerTracker, MarkerPose
+from .roidetector import RoiDetector
+from .pyramiddetector import PyramidDetector
+from .multicamera import MultiCamera, FrameSetMatcher
 from .streamer import Streamer
 from .streamerconfig import StreamerConfig
+from .framequeue import FrameQueue
+from .streamerstats import StreamerStats
+from .keysource import KeySource, HighGuiKeySource, StdinKeySource, ScriptedKeySource
 
 from .exceptions import OpenFailedException
@@ -0,0 +1,41 @@
+"""
+Calibration file conversion script
+
+Converts a camera or projector calibration between the YAML format
+and the binary .npz format. The format of each file is selected by its
+extension: files ending in .npz are binary, all others are YAML.
+
+Usage:
+    calibration-convert <input> [<output>]
+
+Options:
+    <input>             Calibration file to read
+    <output>            Calibration file to write. If omitted, the input
+                        filename with the extension changed to .npz
+"""
+
+import sys
+import os
+
+# Add the parent directory of the current script to sys.path
+sys.path.append(os.path.abspath(os.path.join(__file__, os.pardir, os.pardir, os.pardir)))
+
+from docopt import docopt
+from abilities import Calibration
+
+#
+# Program entry point
+#
+if __name__ == '__main__':
+    args = docopt(__doc__)
+
+    input_file = args['<input>']
+    output_file = args['<output>']
+    if output_file is None:
+        output_file = os.path.splitext(input_file)[0] + '.npz'
+
+    calibration = Calibration()
+    calibration.read(input_file)
+    calibration.write(output_file)
+
+    print(f'Converted {input_file} to {output_file}')
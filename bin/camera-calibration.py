@@ -2,8 +2,9 @@
 Camera calibration script
 
 Usage:
-    camera-calibration --camera=<id> [--show] [--write=<filename>] [--projector=<id>] [--invert] [--offset=<offset>]
-    camera-calibration --files=<description> [--show] [--delay=<delay>] [--write=<filename>] [--offset=<offset>]
+    camera-calibration --camera=<id> [--show] [--write=<filename>] [--projector=<id>] [--invert] [--offset=<offset>] [--views=<n>] [--max-view-error=<px>] [--pyramid=<levels>]
+    camera-calibration --files=<description> [--show] [--delay=<delay>] [--write=<filename>] [--offset=<offset>] [--views=<n>] [--max-view-error=<px>] [--jobs=<n>] [--pyramid=<levels>]
+    camera-calibration --video=<movie> [--stride=<n>] [--min-sharpness=<s>] [--write=<filename>] [--offset=<offset>] [--views=<n>] [--max-view-error=<px>] [--pyramid=<levels>]
 
 Options:
     --camera=<id>               Camera number to use
@@ -14,6 +15,13 @@ Options:
     --projector=<id>            Optional projector screen to set to white output (starting at 1)
     --invert                    If set, invert the camera image (display only)
     --offset=<offset>           Offset to add to the camera calibration
+    --views=<n>                 Solve with at most n captures, chosen for diverse board poses, 0 for all [default: 25]
+    --max-view-error=<px>       Drop captures with a larger reprojection error and solve again
+    --jobs=<n>                  Detect the board in files on n processes, 0 for one per core (without --show)
+    --video=<movie>             Calibrate from a recorded sweep without any display
+    --stride=<n>                Examine every n'th frame of the video [default: 10]
+    --min-sharpness=<s>         Skip video frames with a lower Laplacian variance [default: 50]
+    --pyramid=<levels>          Find the board at 1/2^levels resolution and refine the corners at full resolution
 """
 ### python camera-calibration.py --camera=p1 --show --write='../local/camera-sample.yaml' --offset=13.5,8.5,0
 
@@ -11,11 +11,12 @@ the first Pylon camera.
 Press ESC or q to close the window and exit.
 
 Usage:
-    camera-stream [--camera=<id>] [--projector=<id>]
+    camera-stream [--camera=<id>] [--projector=<id>] [--threaded]
 
 Options:
     --camera=<id>           Camera number to use - starting at 1. Prefix with 'p' to force Pylon camera
     --projector=<id>        Optional projector screen to set to white output (starting at 1)
+    --threaded              Acquire frames on a background thread, showing the latest
 """
 
 import sys
@@ -43,13 +44,15 @@ def stream(docopt_args):
     # height=2160
     # width=3840
     # prefer_pylon=False (default=True)
+    # threaded=True (acquire on a background thread, --threaded)
+    # latest=False (threaded only, return every frame rather than the latest)
     #
     # Pylon-only features:
     # gain = 0 (Pylon only)
     # exposure_time=30000 (microseconds, Pylon only)
     # frame_rate = 30 (Pylon only)
 
-    camera = GeneralCamera(gain=0, frame_rate=30, camera=docopt_args['--camera'])
+    camera = GeneralCamera(gain=0, frame_rate=30, camera=docopt_args['--camera'], threaded=docopt_args['--threaded'])
     if not camera.open():
         print("Unable to open camera")
         return 1
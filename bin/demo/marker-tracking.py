@@ -4,13 +4,14 @@ Marker tracking demonstration script
 Press ESC or q to close the window and exit. + increase zoom, - decreases zoom
 
 Usage:
-    marker-tracking [--camera=<id>] [--movie=<movie>] [--config=<config>] --calibration=<calibration>
+    marker-tracking [--camera=<id>] [--movie=<movie>] [--config=<config>] [--roi=<rescan>] --calibration=<calibration>
 
 Options:
     --camera=<id>           Camera number to use - starting at 1. Prefix with 'p' to force Pylon camera
     --movie=<movie>         Movie to play rather than the camera
     --config=<config>       Config file to use that specifies the parameters
     --calibration=<calibration> Calibration file to use
+    --roi=<rescan>          Detect markers only near where they were, scanning the whole frame every <rescan> frames
 """
 
 import sys
@@ -21,9 +22,10 @@ sys.path.append(os.path.abspath(os.path.join(__file__, os.pardir, os.pardir, os.
 
 from docopt import docopt
 import cv2
-import numpy as np
 from abilities import Streamer
 from abilities import Calibration
+from abilities import MarkerTracker
+from abilities import RoiDetector
 
 class StreamerConcrete(Streamer):
     """
@@ -39,10 +41,9 @@ class StreamerConcrete(Streamer):
         self._calibration.read(docopt_args['--calibration'])
 
         self._marker_size = 0.060
-        dictionary = cv2.aruco.getPredefinedDictionary(cv2.aruco.DICT_4X4_50)
-        self._dictionary = dictionary
-        detection_params = cv2.aruco.DetectorParameters()
-        self._detector = cv2.aruco.ArucoDetector(dictionary, detection_params)
+        self._tracker = MarkerTracker(self._calibration, self._marker_size, cv2.aruco.DICT_4X4_50)
+        if docopt_args['--roi'] is not None:
+            self._tracker.detector = RoiDetector(self._tracker.detector, int(docopt_args['--roi']))
 
     def on_start(self):
         """
@@ -57,15 +58,10 @@ class StreamerConcrete(Streamer):
         :param frame: The OpenCV frame
         """
 
-        marker_corners, marker_ids, rejected_candidates = self._detector.detectMarkers(frame)
-        cv2.aruco.drawDetectedMarkers(frame, marker_corners, marker_ids, (255, 0, 0))
+        with self.timed('track'):
+            poses = self._tracker.track(frame)
 
-        marker_length = self._marker_size
-        obj_points = np.array([[0, 0, 0], [marker_length, 0, 0], [marker_length, marker_length, 0], [0, marker_length, 0]])
-
-        for i in range(0, len(marker_corners)):
-            retval, rvec, tvec = cv2.solvePnP(obj_points, marker_corners[i], self._calibration.mtx, self._calibration.dist)
-            cv2.drawFrameAxes(frame, self._calibration.mtx, self._calibration.dist, rvec, tvec, marker_length)
+        self._tracker.draw(frame, poses)
 
         if self._zoom != 1.0:
             frame = cv2.resize(frame, (0, 0), fx=self._zoom, fy=self._zoom)
@@ -2,10 +2,11 @@
 Demonstration of how to draw on the projector assuming a 2D calibration
 
 Usage:
-    projector-draw-2d --projector=<id> <calibration-file>
+    projector-draw-2d --projector=<id> [--canvas] <calibration-file>
 
 Options:
     --projector=<id>            Projector screen to use (starting at 1)
+    --canvas                    Draw in world coordinates on a ProjectorCanvas
     <calibration-file>          The file to load with the projector calibration data in it
 """
 import sys
@@ -17,8 +18,8 @@ sys.path.append(os.path.abspath(os.path.join(__file__, os.pardir, os.pardir, os.
 from docopt import docopt
 from abilities import Calibration
 from abilities import FullscreenShow
+from abilities import ProjectorCanvas
 import cv2
-import numpy as np
 
 #
 # Program entry point
@@ -36,11 +37,22 @@ if __name__ == '__main__':
     fullscreen = FullscreenShow('projector', int(args['--projector']))
     fullscreen.open()
 
-    # This creates a white image we can draw on and project
-    # Change to zeros to draw black, of ocurse
+    if args['--canvas']:
+        # Draw in millimetres on a canvas covering 0-500mm in x and y. The
+        # whole canvas is mapped to the projector in one warp when shown.
+        canvas = ProjectorCanvas(projector_calibration, fullscreen.size, (0, 0, 500, 500))
+        canvas.clear(255)
+        canvas.line((0, 0), (300, 200), (0, 0, 255))
+        canvas.show(fullscreen)
+
+        cv2.waitKey()
+        sys.exit(0)
+
+    # This gets a white image we can draw on and project
+    # Change to 0 to draw black, of ocurse
     wid = fullscreen.width
     hit = fullscreen.height
-    image = np.ones((hit, wid), dtype=np.float32)
+    image = fullscreen.buffer(255)
 
     # Convert two world coordinates to image coordinates using the projector calibration
     # and draw a line between them
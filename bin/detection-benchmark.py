@@ -0,0 +1,216 @@
+"""
+Marker detection benchmarks
+
+roi: Compares region of interest marker detection (RoiDetector) with
+scanning the whole frame on every frame. Reports the time per frame of
+each, the speed-up and any frames where the detections differ. A
+synthetic sequence of moving markers is rendered if no movie is given.
+
+pyramid: Compares coarse to fine ChArUco detection (PyramidDetector) with
+full resolution detection on synthetic views of the camera calibration
+board with known corner positions. Reports the time per view and the
+corner error against the true positions.
+
+Usage:
+    detection-benchmark roi [--movie=<movie>] [--frames=<n>] [--rescan=<n>] [--size=<wxh>] [--markers=<n>]
+    detection-benchmark pyramid [--levels=<n>] [--size=<wxh>] [--views=<n>]
+
+Options:
+    --movie=<movie>     Movie to read frames from rather than rendering them
+    --frames=<n>        Number of frames [default: 100]
+    --rescan=<n>        Full frame scan interval for the ROI detector [default: 10]
+    --size=<wxh>        Synthetic frame size, 3840x2160 for roi and 4000x3000 for pyramid
+    --markers=<n>       Number of synthetic markers [default: 12]
+    --levels=<n>        Largest number of pyramid levels to compare [default: 2]
+    --views=<n>         Number of synthetic board views [default: 10]
+"""
+
+import sys
+import os
+import time
+
+# Add the parent directory of the current script to sys.path
+sys.path.append(os.path.abspath(os.path.join(__file__, os.pardir, os.pardir, os.pardir)))
+
+from docopt import docopt
+import cv2
+import numpy as np
+from abilities import RoiDetector
+from abilities import PyramidDetector
+from abilities.cameracalibration import _create_board
+
+# Dictionary the synthetic markers are drawn from
+DICTIONARY = cv2.aruco.DICT_4X4_50
+
+
+def synthetic_frames(count, width, height, markers):
+    """
+    Render frames of markers moving across a gray background
+    """
+    dictionary = cv2.aruco.getPredefinedDictionary(DICTIONARY)
+    rng = np.random.default_rng(1)
+
+    marker_size = max(height // 12, 40)
+    border = marker_size // 6
+    images = [cv2.aruco.generateImageMarker(dictionary, i, marker_size) for i in range(0, markers)]
+    start = rng.uniform((border, border), (width - marker_size - border, height - marker_size - border), (markers, 2))
+    velocity = rng.uniform(-4, 4, (markers, 2))
+
+    for f in range(0, count):
+        frame = np.full((height, width), 200, dtype=np.uint8)
+        for i in range(0, markers):
+            # Bounce off the frame edges
+            x, y = start[i] + velocity[i] * f
+            x = int(abs((x - border) % (2 * (width - marker_size - 2 * border)) - (width - marker_size - 2 * border))) + border
+            y = int(abs((y - border) % (2 * (height - marker_size - 2 * border)) - (height - marker_size - 2 * border))) + border
+            frame[y - border:y + marker_size + border, x - border:x + marker_size + border] = 255
+            frame[y:y + marker_size, x:x + marker_size] = images[i]
+
+        yield frame
+
+
+def movie_frames(filename, count):
+    capture = cv2.VideoCapture(filename)
+    for f in range(0, count):
+        ret, frame = capture.read()
+        if not ret:
+            break
+
+        yield cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+    capture.release()
+
+
+def board_views(count, width, height):
+    """
+    Render views of the ChArUco calibration board on a cluttered background
+    through a camera with a 60 degree field of view
+    :return: List of frame and true corner positions, a dictionary of corner id to u, v
+    """
+    _, board, _ = _create_board()
+    rng = np.random.default_rng(2)
+
+    pixels = 4000
+    board_size = board.getChessboardSize()
+    image = board.generateImage((pixels, pixels * board_size[1] // board_size[0]))
+    scale = board_size[0] * board.getSquareLength() / pixels
+
+    f = width / (2 * np.tan(np.radians(30)))
+    mtx = np.array([[f, 0, width / 2], [0, f, height / 2], [0, 0, 1]])
+
+    background = cv2.resize(rng.integers(0, 256, (height // 10, width // 10), dtype=np.uint8), (width, height),
+                            interpolation=cv2.INTER_CUBIC)
+    background = cv2.GaussianBlur(background, (0, 0), 3)
+
+    corners = board.getChessboardCorners()[:, 0:2]
+    views = []
+    for v in range(0, count):
+        rvec = rng.uniform(-0.4, 0.4, 3)
+        tvec = np.array([-0.125 + rng.uniform(-0.05, 0.05), -0.1 + rng.uniform(-0.04, 0.04), rng.uniform(0.45, 0.6)])
+        r, _ = cv2.Rodrigues(rvec)
+        h = mtx @ np.column_stack((r[:, 0], r[:, 1], tvec)) @ np.diag([scale, scale, 1])
+
+        frame = cv2.warpPerspective(image, h, (width, height), dst=background.copy(), flags=cv2.INTER_AREA,
+                                    borderMode=cv2.BORDER_TRANSPARENT)
+        frame = cv2.GaussianBlur(frame, (0, 0), 1.0)
+        frame = np.clip(frame + rng.normal(0, 2, frame.shape), 0, 255).astype(np.uint8)
+
+        # Board image pixel centres are at half pixel offsets
+        p = np.column_stack((corners / scale - 0.5, np.ones(len(corners)))) @ h.T
+        truth = {i: p[i, 0:2] / p[i, 2] for i in range(0, len(corners))}
+        views.append((frame, truth))
+
+    return views
+
+
+def detections(corners, ids):
+    if ids is None:
+        return {}
+
+    return {int(i): c.reshape(4, 2) for c, i in zip(corners, ids.reshape(-1))}
+
+
+def pyramid_benchmark(args):
+    width, height = (int(v) for v in (args['--size'] or '4000x3000').split('x'))
+    views = board_views(int(args['--views']), width, height)
+    print(f'Views: {len(views)} of {width}x{height}')
+
+    _, _, detector = _create_board()
+    baseline = None
+    for levels in range(0, int(args['--levels']) + 1):
+        pyramid = PyramidDetector(detector, levels)
+
+        elapsed = 0.0
+        errors = []
+        found = 0
+        for frame, truth in views:
+            start = time.perf_counter()
+            corners, ids, marker_corners, marker_ids = pyramid.detectBoard(frame)
+            elapsed += time.perf_counter() - start
+
+            if ids is None:
+                continue
+
+            found += len(ids)
+            for c, i in zip(corners.reshape(-1, 2), ids.reshape(-1)):
+                errors.append(np.linalg.norm(c - truth[int(i)]))
+
+        errors = np.array(errors)
+        if baseline is None:
+            baseline = elapsed
+
+        rms = np.sqrt(np.mean(errors ** 2)) if len(errors) > 0 else 0
+        print(f'Levels {levels}: {1000 * elapsed / len(views):.1f} ms/view, speed-up {baseline / elapsed:.2f}x, '
+              f'{found} corners, error RMS {rms:.3f} px, max {errors.max() if len(errors) > 0 else 0:.3f} px')
+
+
+def roi_benchmark(args):
+    count = int(args['--frames'])
+    if args['--movie'] is not None:
+        frames = list(movie_frames(args['--movie'], count))
+    else:
+        width, height = (int(v) for v in (args['--size'] or '3840x2160').split('x'))
+        frames = list(synthetic_frames(count, width, height, int(args['--markers'])))
+
+    dictionary = cv2.aruco.getPredefinedDictionary(DICTIONARY)
+    full = cv2.aruco.ArucoDetector(dictionary, cv2.aruco.DetectorParameters())
+    roi = RoiDetector(cv2.aruco.ArucoDetector(dictionary, cv2.aruco.DetectorParameters()), int(args['--rescan']))
+
+    full_time = 0.0
+    roi_time = 0.0
+    mismatches = 0
+    missed = 0
+    for frame in frames:
+        start = time.perf_counter()
+        expected = detections(*full.detectMarkers(frame)[0:2])
+        full_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        found = detections(*roi.detectMarkers(frame)[0:2])
+        roi_time += time.perf_counter() - start
+
+        # Markers that appear are only found at the next full scan
+        missed += len(set(expected.keys()) - set(found.keys()))
+        for marker_id, c in found.items():
+            if marker_id not in expected or not np.allclose(c, expected[marker_id], atol=1e-3):
+                mismatches += 1
+
+    n = max(len(frames), 1)
+    print(f'Frames: {len(frames)} of {frames[0].shape[1]}x{frames[0].shape[0]}' if len(frames) > 0 else 'No frames')
+    print(f'Full frame: {1000 * full_time / n:.2f} ms/frame')
+    print(f'ROI: {1000 * roi_time / n:.2f} ms/frame ({roi.roi_scans} ROI, {roi.full_scans} full scans)')
+    print(f'Speed-up: {full_time / roi_time if roi_time > 0 else 0:.2f}x')
+    print(f'Pixels scanned: {roi.scanned / max(sum(f.shape[0] * f.shape[1] for f in frames), 1) * 100:.1f}%')
+    print(f'Markers not yet found: {missed}, differing detections: {mismatches}')
+
+
+#
+# Program entry point
+#
+if __name__ == '__main__':
+    args = docopt(__doc__)
+
+    if args['pyramid']:
+        pyramid_benchmark(args)
+    else:
+        roi_benchmark(args)
@@ -18,7 +18,6 @@ sys.path.append(os.path.abspath(os.path.join(__file__, os.pardir, os.pardir, os.
 from docopt import docopt
 from abilities import FullscreenShow
 import cv2
-import numpy as np
 
 #
 # Program entry point
@@ -32,7 +31,7 @@ if __name__ == '__main__':
 
     wid = fullscreen.width
     hit = fullscreen.height
-    image = np.ones((hit, wid), dtype=np.float32)
+    image = fullscreen.buffer(255)
 
     p = args['--point-f'].split(',')
     x = int(wid * float(p[0]))
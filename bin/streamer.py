@@ -13,13 +13,24 @@ the first Pylon camera.
 
 Press ESC or q to close the window and exit. + increase zoom, - decreases zoom
 
+With --headless no window is opened and keys come from --keys, which is
+'none' (default), 'stdin' or a script of frame:key items such as '100:q'.
+
 Usage:
-    camera-stream [--camera=<id>] [--movie=<movie>] [--config=<config>]
+    camera-stream [--camera=<id>] [--movie=<movie>] [--config=<config>] [--camera-threaded] [--headless] [--keys=<keys>] [--pipeline] [--overflow=<policy>] [--every=<n>] [--instrument] [--instrument-file=<file>]
 
 Options:
     --camera=<id>           Camera number to use - starting at 1. Prefix with 'p' to force Pylon camera
     --movie=<movie>         Movie to play rather than the camera
     --config=<config>       Config file to use that specifies the parameters
+    --camera-threaded       Acquire camera frames on a background thread, keeping the latest
+    --headless              Run without display windows
+    --keys=<keys>           Key source when headless: none, stdin or a frame:key script
+    --pipeline              Read frames on a separate thread from processing
+    --overflow=<policy>     When processing falls behind: block, drop-oldest, drop-newest or every-nth
+    --every=<n>             Frame interval for the every-nth policy
+    --instrument            Record per-stage timing and print a summary at the end
+    --instrument-file=<file>    Append timing summaries as JSON lines to this file
 """
 
 import sys
@@ -29,6 +40,7 @@ import os
 sys.path.append(os.path.abspath(os.path.join(__file__, os.pardir, os.pardir, os.pardir)))
 
 from docopt import docopt
+import json
 import cv2
 from abilities import Streamer
 
@@ -46,6 +58,9 @@ class StreamerConcrete(Streamer):
         """
         Called when streaming starts.
         """
+        if self.headless:
+            return
+
         cv2.namedWindow("Video Stream", cv2.WINDOW_AUTOSIZE)
         cv2.startWindowThread()
 
@@ -54,17 +69,25 @@ class StreamerConcrete(Streamer):
         Called for each new frame.
         :param frame: The OpenCV frame
         """
+        if self.headless:
+            return
+
         if self._zoom != 1.0:
             frame = cv2.resize(frame, (0, 0), fx=self._zoom, fy=self._zoom)
 
-        cv2.imshow('Video Stream', frame)
+        with self.timed('display'):
+            cv2.imshow('Video Stream', frame)
 
     def on_stop(self):
         """
         Called when streaming stops, either by the user or end of stream
         :return:
         """
-        cv2.destroyWindow("Video Stream")
+        if not self.headless:
+            cv2.destroyWindow("Video Stream")
+
+        if self.stats is not None:
+            print(json.dumps(self.stats, indent=2))
 
     def on_key(self, key, frame):
         """
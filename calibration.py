@@ -1,7 +1,25 @@
+from collections import namedtuple
+import os
 import yaml
 import numpy as np
 import cv2
 
+# Use the LibYAML based loader and dumper when available
+try:
+    from yaml import CSafeLoader as _YamlLoader, CSafeDumper as _YamlDumper
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader, SafeDumper as _YamlDumper
+
+# Snapshot of a calibration and the values derived from it.
+# mtx, dist: camera matrix (or homography) and distortion coefficients
+# t, r: last pose translation (3x1) and rotation matrix (3x3)
+# r_t: transpose (inverse) of the rotation matrix
+# centre: camera location in the world coordinate system (3x1)
+# rvec, tvec: last rotation and translation vectors
+# mtx_inv: inverse of the camera matrix, or the inverse homography for 2D calibrations
+_CalibrationState = namedtuple('_CalibrationState', ['mtx', 'dist', 't', 'r', 'r_t', 'centre', 'rvec', 'tvec',
+                                                     'mtx_inv'])
+
 
 class Calibration:
     """
@@ -26,6 +44,9 @@ class Calibration:
 
         self._valid = False
 
+        # Snapshot of the calibration, see _state()
+        self._state_cache = Calibration._compute_state(None, None, None, None)
+
     def set(self, imsize, mtx, dist=None, rvecs=None, tvecs=None):
         self.imsize = imsize
         self.mtx = mtx
@@ -33,13 +54,18 @@ class Calibration:
         self.rvecs = rvecs
         self.tvecs = tvecs
         self._valid = True
+        self._update_state()
 
     def write(self, filename):
         """
-        Write the calibration to a YAML format file
+        Write the calibration to a file. Files with a .npz extension
+        are written in the binary NumPy format, all others as YAML.
         :param filename: Filename to write
         :return: None
         """
+        if Calibration.is_binary(filename):
+            self._write_npz(filename)
+            return
 
         data = {'imsize': np.asarray(self.imsize).tolist(),
                 'camera_matrix': np.asarray(self.mtx).tolist(),
@@ -49,16 +75,20 @@ class Calibration:
 
         # and save it to a file
         with open(filename, "w") as f:
-            yaml.dump(data, f)
+            yaml.dump(data, f, Dumper=_YamlDumper)
 
     def read(self, filename):
         """
-        Read a calibration from a YAML format tile
+        Read a calibration from a file. Files with a .npz extension
+        are read in the binary NumPy format, all others as YAML.
         :param filename: Filename to read
         :return: True if successful
         """
+        if Calibration.is_binary(filename):
+            return self._read_npz(filename)
+
         with open(filename, "r") as f:
-            data = yaml.safe_load(f)
+            data = yaml.load(f, Loader=_YamlLoader)
 
         self.imsize = np.asarray(data['imsize'])
         self.mtx = np.asarray(data['camera_matrix'])
@@ -66,8 +96,123 @@ class Calibration:
         self.rvecs = np.asarray(data['rvecs'])
         self.tvecs = np.asarray(data['tvecs'])
         self._valid = True
+        self._update_state()
+        return True
+
+    def _write_npz(self, filename):
+        """
+        Write the calibration as an uncompressed NumPy .npz archive.
+        Arrays are stored exactly. Items that are not set are omitted.
+        :param filename: Filename to write
+        """
+        items = {'imsize': self.imsize,
+                 'camera_matrix': self.mtx,
+                 'dist_coeff': self.dist,
+                 'rvecs': self.rvecs,
+                 'tvecs': self.tvecs}
+
+        data = {}
+        for key, value in items.items():
+            if value is None:
+                continue
+
+            value = np.asarray(value)
+            if value.dtype == object:
+                # A None read from a YAML file
+                continue
+
+            data[key] = value
+
+        with open(filename, "wb") as f:
+            np.savez(f, **data)
+
+    def _read_npz(self, filename):
+        """
+        Read a calibration written by _write_npz
+        :param filename: Filename to read
+        :return: True if successful
+        """
+        with np.load(filename, allow_pickle=False) as data:
+            items = {key: data[key] for key in data.files}
+
+        self.imsize = items.get('imsize')
+        self.mtx = items.get('camera_matrix')
+        self.dist = items.get('dist_coeff')
+        self.rvecs = items.get('rvecs')
+        self.tvecs = items.get('tvecs')
+        self._valid = True
+        self._update_state()
         return True
 
+    @staticmethod
+    def is_binary(filename):
+        """
+        Determine if a calibration filename selects the binary format
+        :param filename: Filename to test
+        :return: True if the file is in binary (.npz) format
+        """
+        return os.path.splitext(str(filename))[1].lower() == '.npz'
+
+    def _update_state(self):
+        """
+        Rebuild the snapshot of the calibration. Must be called whenever
+        mtx, dist, rvecs or tvecs are changed.
+
+        The snapshot is built completely before it replaces the previous
+        one in a single assignment, so a reader on another thread sees
+        either the old or the new calibration, never a mixture.
+        """
+        self._state_cache = Calibration._compute_state(self.mtx, self.dist, self.rvecs, self.tvecs)
+
+    def _state(self):
+        """
+        Get the snapshot of the calibration and the values derived from it.
+
+        The state is immutable (a tuple of read-only arrays) and is replaced
+        rather than modified, so it can be shared between threads without
+        locking. Callers should fetch it once and use that local reference
+        for all values, including mtx and dist.
+        :return: _CalibrationState object
+        """
+        return self._state_cache
+
+    @staticmethod
+    def _compute_state(mtx, dist, rvecs, tvecs):
+        """
+        Compute the snapshot for a calibration
+        :return: _CalibrationState object with read-only arrays
+        """
+        t = r = r_t = centre = rvec = tvec = mtx_inv = None
+
+        # A None read from a YAML file is an object array
+        if mtx is not None and np.asarray(mtx).dtype != object:
+            mtx = np.array(mtx, dtype=np.float64)
+            mtx_inv = np.linalg.inv(mtx)
+        else:
+            mtx = None
+
+        if dist is not None and np.asarray(dist).dtype != object:
+            dist = np.array(dist, dtype=np.float64)
+        else:
+            dist = None
+
+        # 2D calibrations have no pose
+        if rvecs is not None and tvecs is not None and \
+                np.asarray(rvecs).dtype != object and len(rvecs) > 0:
+            rvec = np.array(rvecs[len(rvecs) - 1], dtype=np.float64)
+            tvec = np.array(tvecs[len(tvecs) - 1], dtype=np.float64)
+            t = tvec.reshape(3, 1)
+            r, _ = cv2.Rodrigues(rvec)
+            r_t = np.ascontiguousarray(r.T)
+            centre = r_t @ -t
+
+        state = _CalibrationState(mtx, dist, t, r, r_t, centre, rvec, tvec, mtx_inv)
+        for a in state:
+            if a is not None:
+                a.flags.writeable = False
+
+        return state
+
     def project(self, x, y, z):
         """
         Project a 3D world point to the 2D image space
@@ -76,7 +221,8 @@ class Calibration:
         :param z: Z in world coordinates
         :return: u, v in screen coordinates
         """
-        t, r = self.lastPose()
+        state = self._state()
+        mtx, dist, t, r = state.mtx, state.dist, state.t, state.r
 
         # # Example of how to use projectPoints to do the projection
         # # without doing the actual projection math
@@ -101,13 +247,13 @@ class Calibration:
         xp = c[0][0] / c[2][0]
         yp = c[1][0] / c[2][0]
 
-        if self.dist is not None:
+        if dist is not None:
             # Distortion coefficients
-            k1 = self.dist[0][0]
-            k2 = self.dist[0][1]
-            p1 = self.dist[0][2]
-            p2 = self.dist[0][3]
-            k3 = self.dist[0][4]
+            k1 = dist[0][0]
+            k2 = dist[0][1]
+            p1 = dist[0][2]
+            p2 = dist[0][3]
+            k3 = dist[0][4]
 
             r2 = xp * xp + yp * yp
             r4 = r2 * r2
@@ -119,13 +265,56 @@ class Calibration:
             xpp = xp
             ypp = yp
 
-        uv = np.matmul(self.mtx, np.array([[xpp], [ypp], [1]]))
+        uv = np.matmul(mtx, np.array([[xpp], [ypp], [1]]))
 
         u = uv[0][0]
         v = uv[1][0]
 
         return u, v
 
+    def project_many(self, points):
+        """
+        Project many 3D world points to the 2D image space at once
+
+        This is the vectorized equivalent of project(). The pose is
+        computed once and the distortion is applied to all points
+        in a single NumPy pass.
+        :param points: Array of shape (N, 3) of world coordinates
+        :return: Array of shape (N, 2) of u, v screen coordinates
+        """
+        state = self._state()
+        mtx, dist, t, r = state.mtx, state.dist, state.t, state.r
+
+        w = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+
+        # Convert points to camera coordinates
+        c = w @ r.T + np.reshape(t, (1, 3))
+
+        xp = c[:, 0] / c[:, 2]
+        yp = c[:, 1] / c[:, 2]
+
+        if dist is not None:
+            # Distortion coefficients
+            k1 = dist[0][0]
+            k2 = dist[0][1]
+            p1 = dist[0][2]
+            p2 = dist[0][3]
+            k3 = dist[0][4]
+
+            r2 = xp * xp + yp * yp
+            r4 = r2 * r2
+            r6 = r4 * r2
+            kfactor = (1 + k1 * r2 + k2 * r4 + k3 * r6)
+            xpp = xp * kfactor + 2 * p1 * xp * yp + p2 * (r2 + 2 * xp * xp)
+            ypp = yp * kfactor + p1 * (r2 + 2 * yp * yp) + 2 * p2 * xp * yp
+        else:
+            xpp = xp
+            ypp = yp
+
+        uv = np.column_stack((xpp, ypp, np.ones_like(xpp))) @ np.transpose(mtx)
+
+        return uv[:, 0:2]
+
     def project2d(self, x, y):
         """
         Project a 2D world point to the 2D image space
@@ -135,7 +324,7 @@ class Calibration:
         :return: u, v in screen coordinates
         """
         w = np.array([[x], [y], [1]])
-        p = self.mtx @ w
+        p = self._state().mtx @ w
         u = p[0][0] / p[2][0]
         v = p[1][0] / p[2][0]
 
@@ -149,13 +338,43 @@ class Calibration:
         :return:
         """
         p = np.array([[u], [v], [1]])
-        mtx_inv = np.linalg.inv(self.mtx)
+        mtx_inv = self._state().mtx_inv
         w = mtx_inv @ p
         x = w[0][0] / w[2][0]
         y = w[1][0] / w[2][0]
 
         return x, y
 
+    def project2d_many(self, points):
+        """
+        Project many 2D world points to the 2D image space at once
+        Only works if the calibration matrix is a homography
+        :param points: Array of shape (N, 2) of world x, y coordinates
+        :return: Array of shape (N, 2) of u, v screen coordinates
+        """
+        return Calibration.apply_homography(self._state().mtx, points)
+
+    def unproject2d_many(self, uv):
+        """
+        Unproject many image pixels to world x,y locations at once
+        using the cached inverse homography
+        :param uv: Array of shape (N, 2) of u, v pixels
+        :return: Array of shape (N, 2) of world x, y coordinates
+        """
+        return Calibration.apply_homography(self._state().mtx_inv, uv)
+
+    @staticmethod
+    def apply_homography(h, points):
+        """
+        Apply a homography to many 2D points at once
+        :param h: 3x3 homography
+        :param points: Array of shape (N, 2) of points
+        :return: Array of shape (N, 2) of transformed points
+        """
+        p = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        w = np.column_stack((p, np.ones(len(p)))) @ np.transpose(h)
+        return w[:, 0:2] / w[:, 2:3]
+
     def unproject(self, u, v):
         """
         Convert a value in screen coordinates to a ray that
@@ -170,9 +389,11 @@ class Calibration:
         :param v: V screen coordinate (vertical)
         :return: o, d where o is the ray origin and d is the ray direction in space.
         """
+        state = self._state()
+
         # Remove the camera distortion
         coords = np.array([[u, v]])
-        xy = cv2.undistortPoints(coords, self.mtx, self.dist)
+        xy = cv2.undistortPoints(coords, state.mtx, state.dist)
         xp = xy[0][0][0]  # x-prime
         yp = xy[0][0][1]  # y-prime
 
@@ -182,13 +403,11 @@ class Calibration:
 
         # Convert the point and the camera origin
         # into locations in the world coordinate system
-
-        t, r = self.lastPose()
-        r_inv = np.linalg.inv(r)
+        t, r_inv = state.t, state.r_t
         w = np.matmul(r_inv, (p - t))
 
         # Camera location in the world coordinate system
-        o = np.matmul(r_inv, -t)
+        o = state.centre.copy()
 
         # Direction through u,v on the screen in the world coordinate system
         d = w - o
@@ -196,6 +415,42 @@ class Calibration:
 
         return o, d
 
+    def unproject_many(self, uv):
+        """
+        Convert many screen coordinates to rays in space at once
+
+        This is the vectorized equivalent of unproject(). All points
+        are undistorted with a single undistortPoints call and the
+        inverse pose is cached between calls.
+
+        :param uv: Array of shape (N, 2) of u, v screen coordinates
+        :return: o, d where o and d are (N, 3) arrays of ray origins
+            and unit ray directions in space. All origins are the camera location.
+        """
+        state = self._state()
+        r_t, centre = state.r_t, state.centre.reshape(3)
+
+        coords = np.asarray(uv, dtype=np.float64).reshape(-1, 1, 2)
+        if len(coords) == 0:
+            # undistortPoints returns None for no points
+            return np.empty((0, 3)), np.empty((0, 3))
+
+        # Remove the camera distortion
+        xy = cv2.undistortPoints(coords, state.mtx, state.dist).reshape(-1, 2)
+
+        # Points on a plane parallel to the xy plane
+        # relative to the camera at z=1
+        p = np.column_stack((xy, np.ones(len(xy))))
+
+        # The direction through each point is the camera space
+        # point rotated into the world coordinate system
+        d = p @ r_t.T
+        d = d / np.linalg.norm(d, axis=1, keepdims=True)
+
+        o = np.tile(centre, (len(d), 1))
+
+        return o, d
+
     def ray_intersect_xy(self, o, d, z):
         """
         Computer the intersection of a ray with an x,y plane
@@ -215,15 +470,12 @@ class Calibration:
 
     def lastPose(self):
         # Get the last camera pose
-        t = self.tvecs[len(self.tvecs) - 1]
-        r, _ = cv2.Rodrigues(self.rvecs[len(self.rvecs) - 1])
-        return t, r
+        state = self._state()
+        return state.t, state.r
 
     def lastPoseInv(self):
-        t, r = self.lastPose()
-        t = -t
-        r = np.linalg.inv(r)
-        return t, r
+        state = self._state()
+        return -state.t, state.r_t
 
     @property
     def matrix(self):
@@ -235,11 +487,11 @@ class Calibration:
 
     @property
     def last_tvec(self):
-        return self.tvecs[len(self.tvecs) - 1]
+        return self._state().tvec
 
     @property
     def last_rvec(self):
-        return self.rvecs[len(self.rvecs) - 1]
+        return self._state().rvec
 
     @property
     def valid(self):
@@ -1,12 +1,115 @@
 from .calibration import Calibration
 from .generalcamera import GeneralCamera
 from .fullscreenshow import FullscreenShow
+from .pyramiddetector import PyramidDetector
 import cv2
 import os
 import numpy as np
+import threading
+from concurrent.futures import ProcessPoolExecutor
 
 import xml.etree.ElementTree as et
 
+
+def _create_board(pyramid_levels=0):
+    """
+    Create the ChArUco board used for camera calibration
+    :param pyramid_levels: Pyramid levels for coarse to fine detection, see PyramidDetector
+    :return: dictionary, board, detector
+    """
+    dictionary = cv2.aruco.getPredefinedDictionary(cv2.aruco.DICT_5X5_250)
+    board = cv2.aruco.CharucoBoard((10, 8), 0.025, 0.019, dictionary)
+    board.setLegacyPattern(True)
+    detector = cv2.aruco.CharucoDetector(board)
+    if pyramid_levels > 0:
+        detector = PyramidDetector(detector, pyramid_levels)
+
+    return dictionary, board, detector
+
+
+def _match_points(board, corners, ids, offset):
+    """
+    Get the object and image points for detected ChArUco corners
+    :param board: The ChArUco board
+    :param corners: Detected corners
+    :param ids: Detected corner ids
+    :param offset: Offset added to the object points, so they can be relative to
+        a corner of the card rather than the first marker
+    :return: objectPoints, imagePoints
+    """
+    objectPoints, imagePoints = board.matchImagePoints(corners, ids)
+    objectPoints = np.asarray(objectPoints, dtype=np.float32).reshape(-1, 1, 3) + np.asarray(offset, dtype=np.float32)
+    return objectPoints.astype(np.float32), imagePoints
+
+
+def _view_descriptor(objectPoints, imagePoints, imsize):
+    """
+    Describe a capture by the board pose and its coverage of the image,
+    so near duplicate views are close together
+    :param imsize: Image size as height, width
+    :return: Array of board centre x, y and size as fractions of the image,
+        and the x, y components of the board normal
+    """
+    height, width = imsize[0], imsize[1]
+    o = np.asarray(objectPoints, dtype=np.float64).reshape(-1, 3)[:, 0:2]
+    p = np.asarray(imagePoints, dtype=np.float64).reshape(-1, 2)
+
+    centre = p.mean(axis=0) / [width, height]
+    extent = np.ptp(p, axis=0) / [width, height]
+    size = np.sqrt(extent[0] * extent[1])
+
+    # Board normal from the plane homography with a nominal camera matrix
+    normal = [0.0, 0.0]
+    h, _ = cv2.findHomography(o, p)
+    if h is not None:
+        f = max(width, height)
+        k_inv = np.linalg.inv(np.array([[f, 0, width / 2], [0, f, height / 2], [0, 0, 1]]))
+        m = k_inv @ h
+        n = np.cross(m[:, 0] / np.linalg.norm(m[:, 0]), m[:, 1] / np.linalg.norm(m[:, 1]))
+        n = n / np.linalg.norm(n)
+        if n[2] < 0:
+            n = -n
+        normal = n[0:2]
+
+    return np.array([centre[0], centre[1], size, normal[0], normal[1]])
+
+
+# Board and detector for each process of the filesCalibrate process pool
+_worker_board = None
+_worker_detector = None
+
+
+def _init_worker(pyramid_levels=0):
+    global _worker_board, _worker_detector
+    _, _worker_board, _worker_detector = _create_board(pyramid_levels)
+
+
+def _detect_file(filePath, offset):
+    """
+    Decode an image file and detect the ChArUco board in it. Runs in a
+    filesCalibrate process pool worker.
+    :param filePath: Image file to read
+    :param offset: Object point offset, see _match_points
+    :return: imsize, capture where capture is None or a tuple of
+        corners, ids, objectPoints, imagePoints
+    """
+    frame = cv2.imread(filePath)
+    if frame is None:
+        # Fall back on VideoCapture for formats imread does not handle
+        cap = cv2.VideoCapture(filePath)
+        ret, frame = cap.read()
+        cap.release()
+        if not ret:
+            return None, None
+
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    corners, ids, markerCorners, markerIds = _worker_detector.detectBoard(gray)
+    if corners is None or len(corners) == 0 or len(ids) < 4:
+        return gray.shape, None
+
+    objectPoints, imagePoints = _match_points(_worker_board, corners, ids, offset)
+    return gray.shape, (corners, ids, objectPoints, imagePoints)
+
 class CameraCalibration(Calibration):
 
     def __init__(self):
@@ -28,6 +131,28 @@ class CameraCalibration(Calibration):
         self._write = None
         self._fullscreen = None
         self._offset = [0, 0, 0]
+        self._jobs = None
+        self._pyramid_levels = 0
+
+        # View selection, see _select_views(). Bounds the solve time as
+        # captures accumulate, None uses every capture
+        self._allDescriptors = []
+        self._view_budget = 25
+        self._max_view_error = None
+        self._view_errors = {}
+
+        # Video calibration, see videoCalibrate()
+        self._stride = 10
+        self._min_sharpness = 50.0
+        self._min_view_distance = 0.05
+
+        # Background calibration solver, see _request_compute()
+        self._async = False
+        self._solver = None
+        self._solver_condition = threading.Condition()
+        self._solve_pending = False
+        self._solving = False
+        self._stop_solving = False
         return
 
     def args(self, args, ignore=None):
@@ -57,6 +182,25 @@ class CameraCalibration(Calibration):
         if '--invert' not in ignore and args['--invert']:
             self._invert = args['--invert']
 
+        if '--views' not in ignore and '--views' in args and args['--views']:
+            views = int(args['--views'])
+            self._view_budget = views if views > 0 else None
+
+        if '--max-view-error' not in ignore and '--max-view-error' in args and args['--max-view-error']:
+            self._max_view_error = float(args['--max-view-error'])
+
+        if '--stride' not in ignore and '--stride' in args and args['--stride']:
+            self._stride = max(1, int(args['--stride']))
+
+        if '--min-sharpness' not in ignore and '--min-sharpness' in args and args['--min-sharpness']:
+            self._min_sharpness = float(args['--min-sharpness'])
+
+        if '--jobs' not in ignore and '--jobs' in args and args['--jobs']:
+            self._jobs = int(args['--jobs'])
+
+        if '--pyramid' not in ignore and '--pyramid' in args and args['--pyramid']:
+            self._pyramid_levels = max(0, int(args['--pyramid']))
+
         if '--offset' not in ignore and args['--offset']:
             o = args['--offset'].split(',')
             if len(o) < 3:
@@ -75,6 +219,10 @@ class CameraCalibration(Calibration):
             self.initializeForCalibration()
             self.filesCalibrate(args['--files'])
 
+        elif '--video' not in ignore and '--video' in args and args['--video']:
+            self.initializeForCalibration()
+            self.videoCalibrate(args['--video'])
+
         return True
 
     def initializeForCalibration(self):
@@ -82,11 +230,10 @@ class CameraCalibration(Calibration):
         self._allIds = []
         self._allObjectPoints = []
         self._allImagePoints = []
+        self._allDescriptors = []
+        self._view_errors = {}
 
-        self._dictionary = cv2.aruco.getPredefinedDictionary(cv2.aruco.DICT_5X5_250)
-        self._board = cv2.aruco.CharucoBoard((10, 8), 0.025, 0.019, self._dictionary)
-        self._board.setLegacyPattern(True)
-        self._detector = cv2.aruco.CharucoDetector(self._board)
+        self._dictionary, self._board, self._detector = _create_board(self._pyramid_levels)
 
     def frame(self, frame, take=True):
         # Convert to grayscale
@@ -100,8 +247,8 @@ class CameraCalibration(Calibration):
             frame2 = frame.copy()
 
             if self.valid:
-                cc = self
-                cv2.drawFrameAxes(frame2, cc.mtx, cc.distortion, cc.last_rvec, cc.last_tvec, 0.2)
+                state = self._state()
+                cv2.drawFrameAxes(frame2, state.mtx, state.dist, state.rvec, state.tvec, 0.2)
 
             cv2.aruco.drawDetectedMarkers(frame2, markerCorners, markerIds, (255, 0, 0))
 
@@ -119,41 +266,215 @@ class CameraCalibration(Calibration):
 
         if take and len(corners) > 0:
             if len(ids) >= 4:
-                objectPoints, imagePoints = self._board.matchImagePoints(corners, ids)
-
                 # Optional offset of the object points, so they can be relative to
                 # a corner of the card rather than the first marker
-                objectPoints2 = []
-                for o in objectPoints:
-                    o = [o[0] + self._offset]
-                    objectPoints2.append(o)
-
-                objectPoints2 = np.array(objectPoints2, dtype=np.float32)
-
-                self._allCorners.append(corners)
-                self._allIds.append(ids)
-                self._allObjectPoints.append(objectPoints2)
-                self._allImagePoints.append(imagePoints)
-                print('{} ids {} captures'.format(len(ids), len(self._allCorners)))
-                if len(self._allCorners) > 4:
-                    self._compute()
+                objectPoints, imagePoints = _match_points(self._board, corners, ids, self._offset)
+                self._add_capture(corners, ids, objectPoints, imagePoints)
             else:
                 print('Insufficient captured ids (< 4)')
 
+    def _add_capture(self, corners, ids, objectPoints, imagePoints, compute=True):
+        """
+        Add a capture of the board to the calibration
+        :param compute: If true, recompute the calibration once there are more than four captures
+        """
+        descriptor = _view_descriptor(objectPoints, imagePoints, self.imsize)
+
+        with self._solver_condition:
+            self._allCorners.append(corners)
+            self._allIds.append(ids)
+            self._allObjectPoints.append(objectPoints)
+            self._allImagePoints.append(imagePoints)
+            self._allDescriptors.append(descriptor)
+
+        print('{} ids {} captures'.format(len(ids), len(self._allCorners)))
+        if compute and len(self._allCorners) > 4:
+            if self._async:
+                self._request_compute()
+            else:
+                self._compute()
+
     def _compute(self):
+        self._wait_compute()
+
+        views = self._select_views()
+        objectPoints = [self._allObjectPoints[i] for i in views]
+        imagePoints = [self._allImagePoints[i] for i in views]
+
+        result = self._solve(objectPoints, imagePoints, self.imsize)
+        if result is None:
+            return False
+
+        self._publish(result, views, objectPoints, imagePoints)
+        return True
+
+    def _select_views(self):
+        """
+        Select the captures to solve with. If there are more captures than
+        the view budget, a maximally diverse subset is chosen by farthest point
+        sampling of the view descriptors, starting from the newest capture.
+        :return: Sorted list of capture indices, the newest capture is always last
+        """
+        n = len(self._allDescriptors)
+        budget = self._view_budget
+        if budget is None or n <= budget:
+            return list(range(0, n))
+
+        descriptors = np.array(self._allDescriptors)
+        selected = [n - 1]
+        distance = np.linalg.norm(descriptors - descriptors[n - 1], axis=1)
+        distance[n - 1] = -np.inf
+        while len(selected) < budget:
+            i = int(np.argmax(distance))
+            selected.append(i)
+            distance = np.minimum(distance, np.linalg.norm(descriptors - descriptors[i], axis=1))
+
+            # Never select a capture twice, even once every remaining
+            # capture is identical to a selected one
+            distance[i] = -np.inf
+
+        return sorted(selected)
+
+    def drop_outliers(self, max_error):
+        """
+        Remove captures whose reprojection error in the last solve exceeds a limit
+        :param max_error: Maximum RMS reprojection error in pixels
+        :return: Number of captures removed
+        """
+        self._wait_compute()
+
+        with self._solver_condition:
+            drop = [i for i, error in self._view_errors.items() if error > max_error]
+            for i in sorted(drop, reverse=True):
+                del self._allCorners[i]
+                del self._allIds[i]
+                del self._allObjectPoints[i]
+                del self._allImagePoints[i]
+                del self._allDescriptors[i]
+
+            self._view_errors = {}
+
+        return len(drop)
+
+    def _solve(self, objectPoints, imagePoints, imsize, mtx=None, dist=None):
+        """
+        Run calibrateCamera
+        :param mtx: Optional camera matrix to warm start from
+        :param dist: Distortion coefficients to warm start from
+        :return: mtx, dist, rvecs, tvecs or None if the calibration failed
+        """
+        flags = 0
+        if mtx is not None:
+            flags = cv2.CALIB_USE_INTRINSIC_GUESS
+            mtx = np.array(mtx, dtype=np.float64)
+            dist = None if dist is None else np.array(dist, dtype=np.float64)
+
         try:
-            ret, self.mtx, self.dist, self.rvecs, self.tvecs = cv2.calibrateCamera(self._allObjectPoints, self._allImagePoints, self.imsize, None, None)
+            ret, mtx, dist, rvecs, tvecs = cv2.calibrateCamera(objectPoints, imagePoints, imsize, mtx, dist, flags=flags)
 
             if not ret:
                 print(f'Calibration failed - false return value')
-                return False
+                return None
 
         except Exception as err:
             print(f'Calibration failed: {err}')
-            return False
+            return None
+
+        return mtx, dist, rvecs, tvecs
+
+    def _publish(self, result, views, objectPoints, imagePoints):
+        """
+        Make a solved calibration current and record the reprojection error
+        of each view used. Readers using the calibration snapshot (_state())
+        never see a partially updated calibration.
+        :param result: mtx, dist, rvecs, tvecs from _solve
+        :param views: Capture indices the calibration was solved with
+        """
+        mtx, dist, rvecs, tvecs = result
 
+        errors = {}
+        for i in range(0, len(views)):
+            projected, _ = cv2.projectPoints(objectPoints[i], rvecs[i], tvecs[i], mtx, dist)
+            diff = projected.reshape(-1, 2) - np.asarray(imagePoints[i]).reshape(-1, 2)
+            errors[views[i]] = float(np.sqrt(np.mean(np.sum(diff * diff, axis=1))))
+
+        self.mtx, self.dist, self.rvecs, self.tvecs = result
+        self._view_errors = errors
+        self._update_state()
         self._valid = True
-        return True
+
+    def _request_compute(self):
+        """
+        Ask the background solver to recompute the calibration. Requests made
+        while a solve is running are coalesced into one more solve that uses
+        all captures at that time, warm started from the current calibration.
+        """
+        with self._solver_condition:
+            self._solve_pending = True
+            self._solver_condition.notify_all()
+
+            if self._solver is None:
+                self._stop_solving = False
+                self._solver = threading.Thread(target=self._solver_loop, name='CameraCalibration', daemon=True)
+                self._solver.start()
+
+    def _stop_solver(self):
+        """
+        Stop the background solver once any pending or running solve is complete
+        """
+        with self._solver_condition:
+            solver = self._solver
+            self._stop_solving = True
+            self._solver_condition.notify_all()
+
+        if solver is not None:
+            solver.join()
+
+    def _solver_loop(self):
+        while True:
+            with self._solver_condition:
+                while not self._solve_pending and not self._stop_solving:
+                    self._solver_condition.wait()
+
+                if not self._solve_pending:
+                    self._solver = None
+                    return
+
+                self._solve_pending = False
+                self._solving = True
+
+            # A failed solve must not leave _solving set, or _wait_compute() never returns
+            try:
+                self._background_solve()
+            except Exception as err:
+                print(f'Calibration failed: {err}')
+            finally:
+                with self._solver_condition:
+                    self._solving = False
+                    self._solver_condition.notify_all()
+
+    def _background_solve(self):
+        """
+        Solve with all captures so far, warm started from the current calibration
+        """
+        with self._solver_condition:
+            views = self._select_views()
+            objectPoints = [self._allObjectPoints[i] for i in views]
+            imagePoints = [self._allImagePoints[i] for i in views]
+
+        state = self._state()
+        result = self._solve(objectPoints, imagePoints, self.imsize, state.mtx, state.dist)
+        if result is not None:
+            self._publish(result, views, objectPoints, imagePoints)
+            print(f'Calibration updated from {len(objectPoints)} captures')
+
+    def _wait_compute(self):
+        """
+        Wait for any pending or running background solve to complete
+        """
+        with self._solver_condition:
+            while self._solve_pending or self._solving:
+                self._solver_condition.wait()
 
     def compute(self):
         """
@@ -164,6 +485,13 @@ class CameraCalibration(Calibration):
         if not self._compute():
             return False
 
+        if self._max_view_error is not None:
+            dropped = self.drop_outliers(self._max_view_error)
+            if dropped > 0:
+                print(f'Dropped {dropped} captures with reprojection error over {self._max_view_error} pixels')
+                if not self._compute():
+                    return False
+
         if self._write is not None:
             self.write(self._write)
 
@@ -178,6 +506,9 @@ class CameraCalibration(Calibration):
         # # Start capturing images for calibration
         # cap = cv2.VideoCapture(int(id))
 
+        # Solve on a background thread, so the preview keeps running
+        self._async = True
+
         while True:
             # Get a camera frame
             ret, frame = camera.read()
@@ -196,6 +527,8 @@ class CameraCalibration(Calibration):
             elif key == ord('+'):
                 self._zoom *= 2
 
+        self._async = False
+        self._stop_solver()
         camera.close()
         cv2.destroyAllWindows()
         return True
@@ -206,6 +539,10 @@ class CameraCalibration(Calibration):
 
         dir = os.path.dirname(descriptionFile)
 
+        if self._jobs is not None and self._jobs != 1 and not self._show:
+            filePaths = [dir + "/" + file.text for file in root]
+            return self.parallelFilesCalibrate(filePaths, self._jobs)
+
         for file in root:
             filePath = dir + "/" + file.text
             print(filePath)
@@ -222,7 +559,93 @@ class CameraCalibration(Calibration):
 
         cv2.destroyAllWindows()
 
+    def videoCalibrate(self, filename):
+        """
+        Collect calibration captures from a recorded calibration sweep without
+        any display. Only every stride'th frame is decoded. Frames that are not
+        sharp enough, or whose view of the board is too close to a capture
+        already taken, are skipped. The calibration is not computed until
+        compute() is called.
+        :param filename: Movie file to read
+        :return: Number of captures collected
+        """
+        cap = cv2.VideoCapture(filename)
+        if not cap.isOpened():
+            print(f'Unable to open video {filename}')
+            return 0
 
+        frame_number = -1
+        captures = 0
+
+        while True:
+            frame_number += 1
+            if frame_number % self._stride != 0:
+                # Skip without decoding
+                if not cap.grab():
+                    break
+                continue
+
+            ret, frame = cap.read()
+            if not ret:
+                break
+
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            self.imsize = gray.shape
+
+            # Motion blurred frames have little high frequency content
+            if cv2.Laplacian(gray, cv2.CV_64F).var() < self._min_sharpness:
+                continue
+
+            corners, ids, markerCorners, markerIds = self._detector.detectBoard(gray)
+            if corners is None or len(corners) == 0 or len(ids) < 4:
+                continue
+
+            objectPoints, imagePoints = _match_points(self._board, corners, ids, self._offset)
+
+            descriptor = _view_descriptor(objectPoints, imagePoints, self.imsize)
+            if len(self._allDescriptors) > 0:
+                distance = np.linalg.norm(np.array(self._allDescriptors) - descriptor, axis=1)
+                if np.min(distance) < self._min_view_distance:
+                    continue
+
+            print(f'Frame {frame_number}: ', end='')
+            self._add_capture(corners, ids, objectPoints, imagePoints, compute=False)
+            captures += 1
+
+        cap.release()
+        return captures
+
+    def parallelFilesCalibrate(self, filePaths, jobs=None):
+        """
+        Collect calibration captures from image files, decoding and detecting
+        the board on a process pool. The calibration itself is not computed
+        until compute() is called, so calibrateCamera runs once over all captures.
+        :param filePaths: Image files to use
+        :param jobs: Number of worker processes, None or 0 for one per core
+        :return: Number of captures collected
+        """
+        if jobs is not None and jobs <= 0:
+            jobs = None
+
+        offsets = [self._offset] * len(filePaths)
+        captures = 0
+
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                 initargs=(self._pyramid_levels,)) as executor:
+            for filePath, (imsize, capture) in zip(filePaths, executor.map(_detect_file, filePaths, offsets)):
+                print(filePath)
+                if imsize is None:
+                    continue
+
+                self.imsize = imsize
+                if capture is None:
+                    print('Insufficient captured ids (< 4)')
+                    continue
+
+                self._add_capture(*capture, compute=False)
+                captures += 1
+
+        return captures
 
     #
     # Properties
@@ -237,6 +660,82 @@ class CameraCalibration(Calibration):
         self._show = value
 
 
+    @property
+    def view_budget(self):
+        """
+        Maximum number of captures used in a solve, 25 by default, None for no limit
+        """
+        return self._view_budget
+
+    @view_budget.setter
+    def view_budget(self, value):
+        self._view_budget = value if value is None or value > 0 else None
+
+    @property
+    def max_view_error(self):
+        """
+        Captures with a larger RMS reprojection error in pixels are dropped by compute()
+        """
+        return self._max_view_error
+
+    @max_view_error.setter
+    def max_view_error(self, value):
+        self._max_view_error = value
+
+    @property
+    def stride(self):
+        """
+        Interval between the frames videoCalibrate() examines
+        """
+        return self._stride
+
+    @stride.setter
+    def stride(self, value):
+        self._stride = max(1, int(value))
+
+    @property
+    def min_sharpness(self):
+        """
+        Minimum variance of the Laplacian for videoCalibrate() to use a frame
+        """
+        return self._min_sharpness
+
+    @min_sharpness.setter
+    def min_sharpness(self, value):
+        self._min_sharpness = float(value)
+
+    @property
+    def min_view_distance(self):
+        """
+        Minimum view descriptor distance from existing captures for
+        videoCalibrate() to take a new capture
+        """
+        return self._min_view_distance
+
+    @min_view_distance.setter
+    def min_view_distance(self, value):
+        self._min_view_distance = float(value)
+
+    @property
+    def pyramid_levels(self):
+        """
+        Pyramid levels for coarse to fine board detection, 0 to detect at
+        full resolution. Takes effect at initializeForCalibration().
+        """
+        return self._pyramid_levels
+
+    @pyramid_levels.setter
+    def pyramid_levels(self, value):
+        self._pyramid_levels = max(0, int(value))
+
+    @property
+    def view_errors(self):
+        """
+        RMS reprojection error in pixels of each capture used in the
+        last solve, as a dictionary from capture index to error
+        """
+        return self._view_errors
+
     @property
     def delay(self):
         return self._delay
@@ -0,0 +1,126 @@
+import collections
+import threading
+
+
+class FrameQueue:
+    """
+    Bounded queue of frames between a producer and a consumer thread
+    with an explicit policy for when the consumer falls behind:
+
+    block: the producer waits for room, no frames are lost
+    drop-oldest: the oldest queued frame is discarded, bounding latency
+    drop-newest: the frame being added is discarded
+    every-nth: only every nth frame offered is queued, the producer
+        waits for room as with block
+
+    Counts of dropped and processed (taken by the consumer) frames are kept.
+    """
+
+    BLOCK = 'block'
+    DROP_OLDEST = 'drop-oldest'
+    DROP_NEWEST = 'drop-newest'
+    EVERY_NTH = 'every-nth'
+
+    POLICIES = [BLOCK, DROP_OLDEST, DROP_NEWEST, EVERY_NTH]
+
+    def __init__(self, size, policy=BLOCK, nth=1):
+        """
+        Constructor
+        :param size: Maximum number of queued frames
+        :param policy: Overflow policy, one of FrameQueue.POLICIES
+        :param nth: Frame interval for the every-nth policy
+        """
+        if policy not in FrameQueue.POLICIES:
+            raise ValueError(f"Unknown frame overflow policy {policy}")
+
+        self._size = max(1, int(size))
+        self._policy = policy
+        self._nth = max(1, int(nth))
+
+        self._items = collections.deque()
+        self._condition = threading.Condition()
+        self._closed = False
+
+        self._offered = 0
+        self._dropped = 0
+        self._processed = 0
+
+    def put(self, item):
+        """
+        Offer a frame to the queue, applying the overflow policy
+        :param item: Item to queue
+        :return: True if queued, false if dropped or the queue is closed
+        """
+        with self._condition:
+            if self._closed:
+                return False
+
+            self._offered += 1
+            if self._policy == FrameQueue.EVERY_NTH and (self._offered - 1) % self._nth != 0:
+                self._dropped += 1
+                return False
+
+            if len(self._items) >= self._size:
+                if self._policy == FrameQueue.DROP_NEWEST:
+                    self._dropped += 1
+                    return False
+
+                if self._policy == FrameQueue.DROP_OLDEST:
+                    self._items.popleft()
+                    self._dropped += 1
+
+                else:
+                    while not self._closed and len(self._items) >= self._size:
+                        self._condition.wait()
+
+                    if self._closed:
+                        return False
+
+            self._items.append(item)
+            self._condition.notify_all()
+            return True
+
+    def get(self):
+        """
+        Take the next frame from the queue, waiting if it is empty.
+        Queued frames are still returned after the queue is closed.
+        :return: The item or None if the queue is closed and empty
+        """
+        with self._condition:
+            while not self._closed and len(self._items) == 0:
+                self._condition.wait()
+
+            if len(self._items) == 0:
+                return None
+
+            item = self._items.popleft()
+            self._processed += 1
+            self._condition.notify_all()
+            return item
+
+    def close(self):
+        """
+        Close the queue. Further puts are refused and waiting threads are released.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed
+
+    @property
+    def policy(self):
+        return self._policy
+
+    @property
+    def dropped(self):
+        return self._dropped
+
+    @property
+    def processed(self):
+        return self._processed
+
+    def __len__(self):
+        return len(self._items)
@@ -6,6 +6,10 @@ import platform
 class FullscreenShow:
     """
     Support for creating a full-screen OpenCV imshow window.
+
+    Full-screen black and white frames are allocated once as uint8, and a
+    back buffer is kept that can be drawn on incrementally and shown with
+    show_buffer(). uint8 images are passed to imshow without conversion.
     """
     def __init__(self, name, screen):
         self._name = name
@@ -14,6 +18,11 @@ class FullscreenShow:
         self._height = 0
         self._is_open = False
 
+        self._black = None
+        self._white = None
+        self._buffer = None
+        self._allocate(0, 0)
+
         # print(screeninfo.get_monitors())
 
     def open(self):
@@ -28,25 +37,61 @@ class FullscreenShow:
         print(screen)
         width, height = screen.width, screen.height
 
-        self._width = width
-        self._height = height
-
-        image = np.zeros((height, width), dtype=np.float32)
+        self._allocate(width, height)
 
         window_name = self._name
         cv2.namedWindow(window_name, cv2.WINDOW_NORMAL)
         cv2.moveWindow(window_name, screen.x, screen.y)
-        cv2.imshow(window_name, image)
+        cv2.imshow(window_name, self._black)
 
         cv2.setWindowProperty(window_name, cv2.WND_PROP_FULLSCREEN,
                               cv2.WINDOW_FULLSCREEN)
 
         self._is_open = True
 
+    def _allocate(self, width, height):
+        """
+        Allocate the cached frames for a screen size
+        """
+        self._width = width
+        self._height = height
+        self._black = np.zeros((height, width), dtype=np.uint8)
+        self._white = np.full((height, width), 255, dtype=np.uint8)
+        self._buffer = None
+
     def white(self):
-        if self._is_open:
-            image = np.ones((self._height, self._width), dtype=np.float32)
-            self.imshow(image)
+        self.imshow(self._white)
+
+    def black(self):
+        self.imshow(self._black)
+
+    def buffer(self, clear=None, channels=1):
+        """
+        Get the back buffer, a uint8 image the size of the screen that is
+        kept between calls so it can be drawn on incrementally.
+        :param clear: Optional gray level or BGR color to fill the buffer with
+        :param channels: 1 for a gray buffer, 3 for BGR
+        :return: The buffer
+        """
+        if self._buffer is None or self._buffer.ndim != (2 if channels == 1 else 3):
+            if channels == 1:
+                self._buffer = np.zeros((self._height, self._width), dtype=np.uint8)
+            else:
+                self._buffer = np.zeros((self._height, self._width, channels), dtype=np.uint8)
+
+        if clear is not None:
+            self._buffer[:] = clear
+
+        return self._buffer
+
+    def show_buffer(self):
+        """
+        Show the back buffer as it is, gray or BGR
+        """
+        if self._buffer is None:
+            self.buffer()
+
+        self.imshow(self._buffer)
 
     @staticmethod
     def get_monitors():
@@ -74,6 +119,10 @@ class FullscreenShow:
         return self._width, self._height
 
     def imshow(self, image):
+        """
+        Show an image. uint8 images are displayed as they are, other
+        types are converted by HighGUI on every call.
+        :param image: Image to show
+        """
         if self._is_open:
             cv2.imshow(self._name, image)
-            
@@ -1,4 +1,8 @@
+import collections
+import threading
+import time
 import cv2
+import numpy as np
 
 try:
     from pypylon import pylon
@@ -7,7 +11,7 @@ except ImportError:
     _has_pylon = False
 
 try:
-    from picamera2 import Picamera2
+    from picamera2 import Picamera2, MappedArray
     _has_picamera = True
 except ImportError:
     _has_picamera = False
@@ -18,9 +22,16 @@ class GeneralCamera:
     both normal OpenCV VideoCapture devices and Pylon cameras
 
     Currently only supports on Pylon device (first device found)
+
+    If threaded is set, frames are acquired on a background thread into a
+    bounded ring buffer so camera I/O overlaps the caller's processing.
+    With latest=True read() returns the most recent frame and older
+    frames are discarded. With latest=False read() returns every frame in
+    order and acquisition waits when the buffer is full.
     """
     def __init__(self, width=None, height=None, camera=None, prefer_pylon=True, gain=None,
-                 exposure_time=None, frame_rate=None, white_balance=None, balance_ratio_red=None, balance_ratio_green=None, balance_ratio_blue=None):
+                 exposure_time=None, frame_rate=None, white_balance=None, balance_ratio_red=None, balance_ratio_green=None, balance_ratio_blue=None,
+                 threaded=False, latest=True, buffer_size=4):
         """
         Constructor
         :param width: Specified desired width, default is none
@@ -31,6 +42,9 @@ class GeneralCamera:
         :param camera: Desired camera number starting at 1, prefix with P to specify a Pylon camera.
             If None, select first available camera
         :param prefer_pylon Set true to use Pylon camera if available
+        :param threaded: Set true to acquire frames on a background thread
+        :param latest: Threaded only, true for latest frame semantics, false to return every frame
+        :param buffer_size: Threaded only, number of frames the ring buffer holds
         """
         self._width = width
         self._height = height
@@ -45,6 +59,17 @@ class GeneralCamera:
         self._device = None
         self._source = None
 
+        # Background acquisition
+        self._threaded = threaded
+        self._latest = latest
+        self._buffer = collections.deque(maxlen=max(1, buffer_size))
+        self._buffer_condition = threading.Condition()
+        self._thread = None
+        self._acquiring = False
+        self._dropped = 0
+        self._failed = 0
+        self._timestamp = None
+
         self._require_pylon = False
         self._require_opencv = False
 
@@ -68,7 +93,15 @@ class GeneralCamera:
         Open the camera for display
         :return: True if successful
         """
+        if not self._open():
+            return False
+
+        if self._threaded:
+            self._start_thread()
+
+        return True
 
+    def _open(self):
         if _has_picamera:
             # Using the raspberry pi camera
             return self._open_picamera()
@@ -92,6 +125,8 @@ class GeneralCamera:
             return self._open_opencv(self._camera)
 
     def close(self):
+        self._stop_thread()
+
         if self._source == 'VideoCapture' and self._device is not None:
             self._device.release()
             self._device = None
@@ -134,16 +169,36 @@ class GeneralCamera:
 
         device.Open()
 
+        self._configure_pylon(device)
+
+        # Grabbing continuously (video) with minimal delay
+        self._device.StartGrabbing(pylon.GrabStrategy_LatestImageOnly)
+        self._converter = pylon.ImageFormatConverter()
+
+        # converting to opencv bgr format
+        self._converter.OutputPixelFormat = pylon.PixelType_BGR8packed
+        self._converter.OutputBitAlignment = pylon.OutputBitAlignment_MsbAligned
+
+        # Reused conversion target for read_into
+        self._pylon_image = pylon.PylonImage()
+
+        return True
+
+    def _configure_pylon(self, device):
+        """
+        Apply the camera settings to an open Pylon camera
+        :param device: pylon.InstantCamera
+        """
         if self._width is not None:
-            self._device.Width.Value = self._width
+            device.Width.Value = self._width
         if self._height is not None:
-            self._device.Height.Value = self._height
+            device.Height.Value = self._height
         if self._gain is not None:
             device.Gain.Value = self._gain
         if self._exposure_time is not None:
             device.ExposureTime.Value = self._exposure_time
         if self._white_balance is not None:
-            device.BalanceWhiteAuto.Value =  "Continuous" if self._white_balance else "Off"
+            device.BalanceWhiteAuto.Value = "Continuous" if self._white_balance else "Off"
         if self._frame_rate is not None:
             if self._frame_rate > 0:
                 device.AcquisitionFrameRate.Value = self._frame_rate
@@ -159,18 +214,6 @@ class GeneralCamera:
         if self._balance_ratio_blue is not None:
             device.BalanceRatioSelector.Value = "Blue"
             device.BalanceRatio.Value = self._balance_ratio_blue
-        
-            
-
-        # Grabbing continuously (video) with minimal delay
-        self._device.StartGrabbing(pylon.GrabStrategy_LatestImageOnly)
-        self._converter = pylon.ImageFormatConverter()
-
-        # converting to opencv bgr format
-        self._converter.OutputPixelFormat = pylon.PixelType_BGR8packed
-        self._converter.OutputBitAlignment = pylon.OutputBitAlignment_MsbAligned
-
-        return True
 
     def _open_picamera(self):
         # Initialize Picamera2 and configure the camera
@@ -187,6 +230,52 @@ class GeneralCamera:
         Read a frame from the device. Frame is returned as an OpenCV frame
         :return: success, frame
         """
+        if self._thread is not None:
+            return self._read_buffer()
+
+        ret, frame = self._read_device()
+        self._timestamp = time.perf_counter()
+        return ret, frame
+
+    def read_into(self, buffer):
+        """
+        Read a frame from the device into a caller owned, preallocated
+        array, avoiding a new allocation per frame. The buffer must have
+        the shape and dtype of the frames returned by read(), see create_buffer().
+        A ValueError is raised if it does not.
+
+        VideoCapture decodes directly into the buffer. Pylon copies the grab
+        buffer into it, converting to BGR in a reused image only if the camera
+        does not already deliver BGR. Picamera2 copies the mapped capture buffer
+        into it. The zero_copy property reports which case applies.
+        :param buffer: Numpy array the frame is written into
+        :return: success, buffer
+        """
+        if self._thread is not None:
+            ret, frame = self._read_buffer()
+            if ret:
+                GeneralCamera._copy_frame(buffer, frame)
+            return ret, buffer
+
+        ret, frame = self._read_device(buffer)
+        self._timestamp = time.perf_counter()
+        return ret, buffer
+
+    def create_buffer(self):
+        """
+        Create an array suitable for read_into() by reading one frame
+        :return: Numpy array or None if the read failed
+        """
+        ret, frame = self.read()
+        if not ret:
+            return None
+
+        return np.empty_like(frame)
+
+    def _read_device(self, buffer=None):
+        if buffer is not None:
+            return self._read_device_into(buffer)
+
         if self._source == 'Pylon':
             grab_result = self._device.RetrieveResult(5000, pylon.TimeoutHandling_ThrowException)
             if grab_result.GrabSucceeded():
@@ -203,6 +292,176 @@ class GeneralCamera:
         else:
             return False, None
 
+    def _read_device_into(self, buffer):
+        if self._source == 'Pylon':
+            grab_result = self._device.RetrieveResult(5000, pylon.TimeoutHandling_ThrowException)
+            try:
+                if not grab_result.GrabSucceeded():
+                    return False, None
+
+                if self._converter.ImageHasDestinationFormat(grab_result):
+                    # Already BGR, copy straight out of the grab buffer
+                    with grab_result.GetArrayZeroCopy() as array:
+                        GeneralCamera._copy_frame(buffer, array)
+                else:
+                    self._converter.Convert(self._pylon_image, grab_result)
+                    GeneralCamera._copy_frame(buffer, self._pylon_image.GetArray())
+            finally:
+                grab_result.Release()
+
+            return True, buffer
+        elif self._source == 'VideoCapture':
+            ret, frame = self._device.read(buffer)
+            if ret and frame is not buffer:
+                # The backend reallocated, because the buffer does not match
+                # the frames or is not contiguous
+                GeneralCamera._copy_frame(buffer, frame)
+            return ret, buffer
+        elif self._source == 'picamera2':
+            request = self._picam2.capture_request()
+            try:
+                with MappedArray(request, 'main') as mapped:
+                    GeneralCamera._copy_frame(buffer, mapped.array)
+            finally:
+                request.release()
+
+            return True, buffer
+        else:
+            return False, None
+
+    @staticmethod
+    def _copy_frame(buffer, frame):
+        """
+        Copy a frame into a read_into() buffer
+        :raises ValueError: If the buffer does not match the frame shape and dtype
+        """
+        if buffer.shape != frame.shape or buffer.dtype != frame.dtype:
+            raise ValueError(f'read_into buffer is {buffer.shape} {buffer.dtype} but frames are '
+                             f'{frame.shape} {frame.dtype}, create the buffer with create_buffer()')
+
+        np.copyto(buffer, frame)
+
+    def _start_thread(self):
+        self._buffer.clear()
+        self._dropped = 0
+        self._failed = 0
+        self._acquiring = True
+        self._thread = threading.Thread(target=self._acquire, name='GeneralCamera', daemon=True)
+        self._thread.start()
+
+    def _stop_thread(self):
+        if self._thread is None:
+            return
+
+        with self._buffer_condition:
+            self._acquiring = False
+            self._buffer_condition.notify_all()
+
+        self._thread.join()
+        self._thread = None
+        self._buffer.clear()
+
+    def _is_live(self):
+        """
+        True for sources where a failed read is a lost frame rather than
+        the end of the stream
+        """
+        return self._source in ('Pylon', 'picamera2')
+
+    def _acquire(self):
+        """
+        Background acquisition loop. Each buffer entry is a
+        (success, frame, timestamp) tuple. Failed reads from live cameras
+        are skipped and counted, as read() would return them as single bad
+        frames. Any other failed read is the end of the stream and ends
+        acquisition.
+        """
+        live = self._is_live()
+        while self._acquiring:
+            try:
+                ret, frame = self._read_device()
+            except Exception as err:
+                print(f'Camera acquisition failed: {err}')
+                ret, frame = False, None
+
+            if not ret and live:
+                self._failed += 1
+                continue
+
+            timestamp = time.perf_counter()
+
+            with self._buffer_condition:
+                if not self._latest:
+                    # Every frame semantics, wait for room in the buffer
+                    while self._acquiring and len(self._buffer) == self._buffer.maxlen:
+                        self._buffer_condition.wait()
+
+                elif len(self._buffer) == self._buffer.maxlen:
+                    # The oldest frame is pushed out of the ring buffer
+                    self._dropped += 1
+
+                self._buffer.append((ret, frame, timestamp))
+                self._buffer_condition.notify_all()
+
+                if not ret:
+                    self._acquiring = False
+
+    def _read_buffer(self):
+        with self._buffer_condition:
+            while len(self._buffer) == 0:
+                if not self._acquiring:
+                    return False, None
+
+                self._buffer_condition.wait()
+
+            if self._latest:
+                ret, frame, timestamp = self._buffer.pop()
+                self._dropped += len(self._buffer)
+                self._buffer.clear()
+            else:
+                ret, frame, timestamp = self._buffer.popleft()
+
+            self._buffer_condition.notify_all()
+
+        self._timestamp = timestamp
+        return ret, frame
+
+    @property
+    def zero_copy(self):
+        """
+        True if read_into() writes frames directly into the caller's buffer
+        with no intermediate copy. False if the frame is copied from a driver
+        buffer (Picamera2, Pylon) or from the ring buffer (threaded acquisition).
+        Pylon cameras that do not deliver BGR8 also need a conversion copy.
+        """
+        return self._source == 'VideoCapture' and self._thread is None
+
+    @property
+    def threaded(self):
+        return self._threaded
+
+    @property
+    def dropped(self):
+        """
+        Number of frames acquired on the background thread that were
+        discarded without being returned by read()
+        """
+        return self._dropped
+
+    @property
+    def failed(self):
+        """
+        Number of failed reads from a live camera skipped on the background thread
+        """
+        return self._failed
+
+    @property
+    def timestamp(self):
+        """
+        time.perf_counter() time when the frame last returned by read() was acquired
+        """
+        return self._timestamp
+
     @property
     def width(self):
         if self._source == 'Pylon':
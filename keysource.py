@@ -0,0 +1,124 @@
+import queue
+import sys
+import threading
+import cv2
+
+# Key value when no key is available, matches cv2.waitKey(...) & 0xff
+NO_KEY = 0xff
+
+
+class KeySource:
+    """
+    Source of key presses for Streamer. The default implementation
+    never produces a key, which is the headless 'none' source.
+    """
+
+    def poll(self, frame_number, block=False):
+        """
+        Get the next key press
+        :param frame_number: Current frame number
+        :param block: True to wait for a key (while paused)
+        :return: Key code or NO_KEY if no key is available. A source
+            that cannot wait returns NO_KEY even if block is true.
+        """
+        return NO_KEY
+
+    def close(self):
+        pass
+
+    @staticmethod
+    def create(keys):
+        """
+        Create a headless key source from a description
+        :param keys: None or 'none' for no keys, 'stdin' to read keys from
+            standard input, otherwise a script, see ScriptedKeySource
+        :return: KeySource object
+        """
+        if keys is None or keys == 'none':
+            return KeySource()
+
+        if keys == 'stdin':
+            return StdinKeySource()
+
+        return ScriptedKeySource(keys)
+
+
+class HighGuiKeySource(KeySource):
+    """
+    Key presses from the OpenCV HighGUI windows using cv2.waitKey
+    """
+
+    def poll(self, frame_number, block=False):
+        return cv2.waitKey(0 if block else 1) & 0xff
+
+
+class StdinKeySource(KeySource):
+    """
+    Key presses read from standard input. Each character of each
+    line entered is one key press.
+    """
+
+    def __init__(self, stream=None):
+        self._stream = stream if stream is not None else sys.stdin
+        self._keys = queue.Queue()
+        self._eof = False
+        self._thread = threading.Thread(target=self._read, name='StdinKeySource', daemon=True)
+        self._thread.start()
+
+    def _read(self):
+        for line in self._stream:
+            for c in line.rstrip('\r\n'):
+                self._keys.put(ord(c) & 0xff)
+
+        self._eof = True
+        self._keys.put(None)
+
+    def poll(self, frame_number, block=False):
+        try:
+            key = self._keys.get(block=block and not self._eof)
+        except queue.Empty:
+            return NO_KEY
+
+        if key is None:
+            # End of input, keep the marker for later polls
+            self._keys.put(None)
+            return NO_KEY
+
+        return key
+
+
+class ScriptedKeySource(KeySource):
+    """
+    Key presses from a script of frame:key items separated by commas,
+    for example '30:p,31:p,100:q'. The key is a single character or a
+    numeric key code. Keys for a frame are delivered in order when that
+    frame is polled. While paused, the following keys are delivered
+    regardless of their frame number.
+    """
+
+    def __init__(self, script):
+        self._script = []
+        for item in script.split(','):
+            if item.strip() == '':
+                continue
+
+            frame, key = item.split(':', 1)
+            if len(key) == 1:
+                key = ord(key)
+            else:
+                key = int(key)
+
+            self._script.append((int(frame), key & 0xff))
+
+        self._script.sort(key=lambda item: item[0])
+
+    def poll(self, frame_number, block=False):
+        if len(self._script) == 0:
+            return NO_KEY
+
+        frame, key = self._script[0]
+        if block or frame <= frame_number:
+            self._script.pop(0)
+            return key
+
+        return NO_KEY
@@ -0,0 +1,201 @@
+from collections import namedtuple
+import numpy as np
+import cv2
+
+# Pose of one tracked marker
+# id: marker id
+# rvec, tvec: marker centre pose in camera coordinates (3x1)
+# corners: detected image corners (4x2)
+# error: RMS reprojection error in pixels
+MarkerPose = namedtuple('MarkerPose', ['id', 'rvec', 'tvec', 'corners', 'error'])
+
+
+class MarkerTracker:
+    """
+    Pose tracking for square ArUco markers seen by a calibrated camera.
+
+    All marker corners in a frame are undistorted in one call, so each
+    pose is solved on normalized image coordinates with no per-marker
+    distortion handling, using the square marker solver
+    (SOLVEPNP_IPPE_SQUARE). A square seen at a distance has two poses that
+    fit almost equally well. For a marker that was tracked in a previous
+    frame, the pose closest to the previous one is chosen, so the pose
+    does not flip between the two from frame to frame.
+
+    Poses are of the marker centre with x right, y up and z out of the
+    marker, as for cv2.aruco.estimatePoseSingleMarkers.
+    """
+
+    def __init__(self, calibration, marker_length, dictionary=cv2.aruco.DICT_4X4_50, max_age=1, max_error=2.0):
+        """
+        Constructor
+        :param calibration: Camera calibration (a Calibration object)
+        :param marker_length: Marker side length, poses are in the same units
+        :param dictionary: Predefined ArUco dictionary id
+        :param max_age: Number of frames a marker may be missing and still be tracked from its last pose
+        :param max_error: Maximum RMS reprojection error in pixels of a pose chosen
+            because it is closest to the previous pose
+        """
+        self._calibration = calibration
+        self._marker_length = marker_length
+        self._max_age = max_age
+        self._max_error = max_error
+
+        self._dictionary = cv2.aruco.getPredefinedDictionary(dictionary)
+        self._detector = cv2.aruco.ArucoDetector(self._dictionary, cv2.aruco.DetectorParameters())
+
+        # Marker corners in marker coordinates, in the order required by SOLVEPNP_IPPE_SQUARE
+        half = marker_length / 2
+        self._obj_points = np.array([[-half, half, 0], [half, half, 0], [half, -half, 0], [-half, -half, 0]],
+                                    dtype=np.float64)
+
+        # Solving on normalized coordinates, so an identity camera
+        self._identity = np.eye(3)
+        self._no_distortion = np.zeros(5)
+
+        # Last pose of each marker and the frame it was seen in
+        self._poses = {}
+        self._frame = 0
+
+        self._tracked = 0
+        self._solved = 0
+
+    @property
+    def detector(self):
+        return self._detector
+
+    @detector.setter
+    def detector(self, detector):
+        self._detector = detector
+
+    @property
+    def marker_length(self):
+        return self._marker_length
+
+    @property
+    def obj_points(self):
+        return self._obj_points
+
+    @property
+    def poses(self):
+        """
+        Poses from the last frame, a dictionary of marker id to MarkerPose
+        """
+        return {marker_id: pose for marker_id, (pose, frame) in self._poses.items() if frame == self._frame}
+
+    @property
+    def tracked(self):
+        """
+        Number of poses chosen using a previous pose
+        """
+        return self._tracked
+
+    @property
+    def solved(self):
+        """
+        Number of poses chosen without a previous pose, the best fitting solution
+        """
+        return self._solved
+
+    def reset(self):
+        """
+        Forget all previous poses
+        """
+        self._poses = {}
+
+    def track(self, frame):
+        """
+        Detect the markers in a frame and estimate their poses
+        :param frame: Camera frame
+        :return: Dictionary of marker id to MarkerPose
+        """
+        corners, ids, rejected = self._detector.detectMarkers(frame)
+        return self.estimate(corners, ids)
+
+    def estimate(self, corners, ids):
+        """
+        Estimate the poses of detected markers
+        :param corners: Marker corners as returned by detectMarkers
+        :param ids: Marker ids as returned by detectMarkers
+        :return: Dictionary of marker id to MarkerPose
+        """
+        self._frame += 1
+        if ids is None or len(ids) == 0:
+            self._expire()
+            return {}
+
+        ids = np.asarray(ids).reshape(-1)
+        image = np.asarray(corners, dtype=np.float64).reshape(-1, 2)
+
+        # Undistort all corners at once
+        cc = self._calibration
+        normalized = cv2.undistortPoints(image.reshape(-1, 1, 2), cc.mtx, cc.dist).reshape(-1, 4, 2)
+        image = image.reshape(-1, 4, 2)
+
+        # Reprojection errors are measured in normalized coordinates, scaled by the focal length
+        focal = (cc.mtx[0][0] + cc.mtx[1][1]) / 2
+        max_error = self._max_error / focal
+
+        poses = {}
+        for i in range(0, len(ids)):
+            marker_id = int(ids[i])
+
+            count, rvecs, tvecs, errors = cv2.solvePnPGeneric(self._obj_points, normalized[i], self._identity,
+                                                              self._no_distortion, flags=cv2.SOLVEPNP_IPPE_SQUARE)
+            if count == 0:
+                continue
+
+            # Solutions are sorted by error, prefer the one nearest the previous
+            # pose if it also fits the corners
+            best = None
+            previous = self._poses.get(marker_id)
+            if previous is not None and self._frame - previous[1] <= self._max_age:
+                r_previous, _ = cv2.Rodrigues(previous[0].rvec)
+                distances = [np.linalg.norm(cv2.Rodrigues(rvecs[j])[0] - r_previous) for j in range(0, count)]
+                nearest = int(np.argmin(distances))
+                if errors[nearest][0] <= max_error:
+                    best = nearest
+                    self._tracked += 1
+
+            if best is None:
+                best = 0
+                self._solved += 1
+
+            pose = MarkerPose(marker_id, rvecs[best], tvecs[best], image[i], errors[best][0] * focal)
+            poses[marker_id] = pose
+            self._poses[marker_id] = (pose, self._frame)
+
+        self._expire()
+        return poses
+
+    def _expire(self):
+        """
+        Forget markers that have not been seen for longer than max_age frames
+        """
+        expired = [marker_id for marker_id, (pose, frame) in self._poses.items() if self._frame - frame > self._max_age]
+        for marker_id in expired:
+            del self._poses[marker_id]
+
+    def draw(self, frame, poses=None, length=None):
+        """
+        Draw the detected markers and their axes on a frame
+        :param frame: Frame to draw on
+        :param poses: Dictionary of MarkerPose, the last frame's poses if None
+        :param length: Axis length, the marker length if None
+        """
+        if poses is None:
+            poses = self.poses
+
+        if length is None:
+            length = self._marker_length
+
+        if len(poses) == 0:
+            return
+
+        corners = [pose.corners.reshape(1, 4, 2).astype(np.float32) for pose in poses.values()]
+        ids = np.array([[pose.id] for pose in poses.values()], dtype=np.int32)
+        cv2.aruco.drawDetectedMarkers(frame, corners, ids, (255, 0, 0))
+
+        cc = self._calibration
+        for pose in poses.values():
+            cv2.drawFrameAxes(frame, cc.mtx, cc.dist, pose.rvec, pose.tvec, length)
@@ -0,0 +1,353 @@
+import collections
+import threading
+import time
+from .generalcamera import GeneralCamera
+from .generalcamera import _has_pylon
+
+if _has_pylon:
+    from pypylon import pylon
+
+
+class FrameSetMatcher:
+    """
+    Matches frames from several cameras into sets by timestamp.
+
+    Frames are queued per camera in timestamp order. A set is formed from
+    the oldest frame of each camera once all of them are within the
+    tolerance of each other. A frame older than the newest of those
+    by more than the tolerance can not be part of any set, because the
+    other cameras' later frames are later still, and it is dropped.
+    """
+
+    def __init__(self, count, tolerance, size=8):
+        """
+        Constructor
+        :param count: Number of cameras
+        :param tolerance: Largest timestamp difference in seconds between frames of a set
+        :param size: Maximum number of frames queued per camera, the oldest are dropped beyond that
+        """
+        self._tolerance = tolerance
+        self._queues = [collections.deque() for i in range(0, count)]
+        self._size = max(1, size)
+        self._condition = threading.Condition()
+        self._closed = False
+
+        self._matched = 0
+        self._dropped = 0
+
+    def put(self, index, timestamp, frame):
+        """
+        Add a frame
+        :param index: Camera index
+        :param timestamp: Frame timestamp in seconds
+        :param frame: The frame
+        """
+        with self._condition:
+            queue = self._queues[index]
+            if len(queue) >= self._size:
+                queue.popleft()
+                self._dropped += 1
+
+            queue.append((timestamp, frame))
+            self._condition.notify_all()
+
+    def get(self, timeout=None):
+        """
+        Get the next matched set, waiting for one if necessary
+        :param timeout: Maximum time to wait in seconds, None to wait until closed
+        :return: timestamps, frames lists in camera order, or None, None if
+            the timeout expired or the matcher is closed
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while True:
+                result = self._match()
+                if result is not None:
+                    return result
+
+                if self._closed:
+                    return None, None
+
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None, None
+
+                self._condition.wait(remaining)
+
+    def _match(self):
+        """
+        Form a set from the queue heads if possible, dropping frames that
+        can not be matched. Called with the lock held.
+        """
+        while all(len(queue) > 0 for queue in self._queues):
+            newest = max(queue[0][0] for queue in self._queues)
+
+            stale = False
+            for queue in self._queues:
+                while len(queue) > 0 and queue[0][0] < newest - self._tolerance:
+                    queue.popleft()
+                    self._dropped += 1
+                    stale = True
+
+            if stale:
+                continue
+
+            heads = [queue.popleft() for queue in self._queues]
+            self._matched += 1
+            return [head[0] for head in heads], [head[1] for head in heads]
+
+        return None
+
+    def close(self):
+        """
+        Close the matcher, waiting get() calls return once no set can be formed
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def clear(self):
+        with self._condition:
+            for queue in self._queues:
+                queue.clear()
+
+            self._closed = False
+
+    @property
+    def matched(self):
+        return self._matched
+
+    @property
+    def dropped(self):
+        return self._dropped
+
+
+class MultiCamera:
+    """
+    Synchronized frame acquisition from several cameras.
+
+    read() returns one frame from each camera, matched by timestamp within
+    a tolerance. If all of the cameras are Pylon cameras ('p1', 'p2', ...)
+    they are grabbed together as a pylon.InstantCameraArray and matched by
+    the device timestamp of each frame. The camera clocks must share a time
+    base for this, for example through PTP (IEEE 1588) or a timestamp reset
+    with a common hardware trigger. Any other cameras are opened as
+    GeneralCamera objects, each read on its own thread, and frames are
+    matched by their arrival time.
+    """
+
+    def __init__(self, cameras, tolerance=0.005, timeout=5.0, buffer_size=8, timestamp_scale=1e-9, **settings):
+        """
+        Constructor
+        :param cameras: List of camera numbers as for GeneralCamera, or objects with the
+            GeneralCamera open, read, close interface and timestamp property
+        :param tolerance: Largest difference in seconds between the timestamps of a set of frames
+        :param timeout: Time in seconds read() waits for a set of frames
+        :param buffer_size: Number of frames queued per camera while waiting for a match
+        :param timestamp_scale: Seconds per Pylon device timestamp tick
+        :param settings: Camera settings passed to GeneralCamera, for example gain or exposure_time
+        """
+        self._cameras = list(cameras)
+        self._tolerance = tolerance
+        self._timeout = timeout
+        self._timestamp_scale = timestamp_scale
+        self._settings = settings
+
+        self._matcher = FrameSetMatcher(len(self._cameras), tolerance, buffer_size)
+        self._devices = []
+        self._array = None
+        self._source = None
+        self._threads = []
+        self._acquiring = False
+        self._timestamps = None
+
+    def open(self):
+        """
+        Open all of the cameras and start acquisition
+        :return: True if successful
+        """
+        if len(self._cameras) == 0:
+            return False
+
+        self._matcher.clear()
+        self._acquiring = True
+
+        pylon_ids = [str(camera).lower() for camera in self._cameras if isinstance(camera, (str, int))]
+        if _has_pylon and len(pylon_ids) == len(self._cameras) and all(c.startswith('p') for c in pylon_ids):
+            if not self._open_pylon_array([int(c[1:]) for c in pylon_ids]):
+                self._acquiring = False
+                return False
+
+            self._start_thread(self._grab_pylon_array)
+            return True
+
+        self._source = 'arrival'
+        for camera in self._cameras:
+            if isinstance(camera, (str, int)):
+                camera = GeneralCamera(camera=camera, **self._settings)
+
+            if not camera.open():
+                print(f'Unable to open camera {camera}')
+                self.close()
+                return False
+
+            self._devices.append(camera)
+
+        for index, camera in enumerate(self._devices):
+            self._start_thread(self._read_camera, index, camera)
+
+        return True
+
+    def _open_pylon_array(self, numbers):
+        """
+        Open Pylon cameras as an InstantCameraArray
+        :param numbers: Camera numbers starting at 1
+        :return: True if successful
+        """
+        tlf = pylon.TlFactory.GetInstance()
+        devices = tlf.EnumerateDevices()
+        for number in numbers:
+            if number < 1 or number > len(devices):
+                print(f'Pylon camera {number} is not available')
+                return False
+
+        array = pylon.InstantCameraArray(len(numbers))
+        for index, (camera, number) in enumerate(zip(array, numbers)):
+            camera.Attach(tlf.CreateDevice(devices[number - 1]))
+            camera.SetCameraContext(index)
+
+        array.Open()
+
+        # GeneralCamera applies the settings to each camera
+        settings = GeneralCamera(**self._settings)
+        for camera in array:
+            settings._configure_pylon(camera)
+
+        # Every frame is retrieved so that each can be matched
+        array.StartGrabbing(pylon.GrabStrategy_OneByOne)
+
+        self._converter = pylon.ImageFormatConverter()
+        self._converter.OutputPixelFormat = pylon.PixelType_BGR8packed
+        self._converter.OutputBitAlignment = pylon.OutputBitAlignment_MsbAligned
+
+        self._array = array
+        self._source = 'Pylon'
+        return True
+
+    def _start_thread(self, target, *args):
+        thread = threading.Thread(target=target, args=args, name='MultiCamera', daemon=True)
+        self._threads.append(thread)
+        thread.start()
+
+    def _grab_pylon_array(self):
+        """
+        Acquisition loop for the InstantCameraArray, frames from all of
+        the cameras arrive here tagged with the camera context
+        """
+        while self._acquiring and self._array.IsGrabbing():
+            try:
+                grab_result = self._array.RetrieveResult(5000, pylon.TimeoutHandling_ThrowException)
+            except Exception as err:
+                print(f'Camera acquisition failed: {err}')
+                break
+
+            try:
+                if grab_result.GrabSucceeded():
+                    frame = self._converter.Convert(grab_result).GetArray()
+                    timestamp = grab_result.TimeStamp * self._timestamp_scale
+                    self._matcher.put(grab_result.GetCameraContext(), timestamp, frame)
+            finally:
+                grab_result.Release()
+
+        self._matcher.close()
+
+    def _read_camera(self, index, camera):
+        """
+        Acquisition loop for one camera, the frame timestamp is the
+        time the frame was read. A failed read ends acquisition.
+        """
+        while self._acquiring:
+            try:
+                ret, frame = camera.read()
+            except Exception as err:
+                print(f'Camera acquisition failed: {err}')
+                ret = False
+
+            if not ret:
+                break
+
+            timestamp = camera.timestamp if camera.timestamp is not None else time.perf_counter()
+            self._matcher.put(index, timestamp, frame)
+
+        self._matcher.close()
+
+    def read(self):
+        """
+        Read a set of frames, one from each camera
+        :return: success, list of frames in camera order
+        """
+        timestamps, frames = self._matcher.get(self._timeout)
+        if frames is None:
+            return False, None
+
+        self._timestamps = timestamps
+        return True, frames
+
+    def close(self):
+        self._acquiring = False
+        self._matcher.close()
+
+        if self._array is not None:
+            self._array.StopGrabbing()
+
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+        if self._array is not None:
+            self._array.Close()
+            self._array = None
+
+        for camera in self._devices:
+            camera.close()
+        self._devices = []
+
+    @property
+    def count(self):
+        """
+        Number of cameras
+        """
+        return len(self._cameras)
+
+    @property
+    def source(self):
+        """
+        'Pylon' for an InstantCameraArray matched by device timestamp,
+        'arrival' for cameras matched by arrival time
+        """
+        return self._source
+
+    @property
+    def timestamps(self):
+        """
+        Timestamps in seconds of the frames last returned by read()
+        """
+        return self._timestamps
+
+    @property
+    def tolerance(self):
+        return self._tolerance
+
+    @property
+    def matched(self):
+        """
+        Number of frame sets formed
+        """
+        return self._matcher.matched
+
+    @property
+    def dropped(self):
+        """
+        Number of frames discarded because they could not be matched
+        """
+        return self._matcher.dropped
@@ -1,12 +1,15 @@
 from .calibration import Calibration
 from .fullscreenshow import FullscreenShow
 from .generalcamera import GeneralCamera
+from .roidetector import RoiDetector
+from .pyramiddetector import PyramidDetector
 import numpy as np
 import cv2
 import yaml
 import json
 import os
 import math
+import zlib
 
 
 class ProjectorCalibration(Calibration):
@@ -25,6 +28,22 @@ class ProjectorCalibration(Calibration):
         self._projected_corners = {}
         self._write = None
 
+        # Marker dictionary and detector, created once
+        self._dictionary_id = cv2.aruco.DICT_6X6_1000
+        self._dictionary = cv2.aruco.getPredefinedDictionary(self._dictionary_id)
+        self._detector = cv2.aruco.ArucoDetector(self._dictionary, cv2.aruco.DetectorParameters())
+
+        # Directory marker patterns are cached in, None for no cache
+        self._marker_cache = os.path.join(os.path.expanduser('~'), '.cache', 'abilities')
+
+        # Surface polygons in the camera image and the label mask
+        # derived from them, see _surface_labels()
+        self._surface_polygons = None
+        self._surface_labels_cache = None
+
+        # Pre-rendered axes and surface outlines with their mask, see _overlay()
+        self._overlay_cache = None
+
     def args(self, args):
         config_file = args['<config-file>']
         dirname = os.path.dirname(config_file)
@@ -40,8 +59,27 @@ class ProjectorCalibration(Calibration):
         camera_calibration_file = config['camera-calibration']
         self._camera_calibration.read(dirname + '/' + camera_calibration_file)
         self._write = dirname + '/' + config['write']
+        if int(config.get('pyramid-levels', 0)) > 0:
+            self._detector = PyramidDetector(self._detector, int(config['pyramid-levels']))
+
+        if config.get('roi-detection', False):
+            self._detector = RoiDetector(self._detector, int(config.get('roi-rescan', 10)))
+
+        if 'marker-cache' in config:
+            marker_cache = config['marker-cache']
+            self._marker_cache = None if marker_cache is None else os.path.join(dirname, marker_cache)
 
         self._surfaces = config['surfaces']
+        self._invalidate_surfaces()
+
+    def _invalidate_surfaces(self):
+        """
+        Discard the cached surface polygons, label mask and overlay. Must be
+        called when the surfaces or the camera calibration change.
+        """
+        self._surface_polygons = None
+        self._surface_labels_cache = None
+        self._overlay_cache = None
 
     def calibrate(self):
         self._project_markers()
@@ -94,48 +132,50 @@ class ProjectorCalibration(Calibration):
 
 
     def _compute_calibration(self, detected_corners, detected_ids):
-        world_points = []
+        # Gather the corners of all markers we generated, with the surface they are on
+        surface_index = []
+        camera_corners = []
         image_points = []
 
         for s in range(0, len(self._surfaces)):
-            surface = self._surfaces[s]
             surface_corners = detected_corners[s]
             surface_ids = detected_ids[s]
 
-            # Points on the surface
-            p0 = self.tuple_to_column_matrix(surface[0])
-            p1 = self.tuple_to_column_matrix(surface[1])
-            p2 = self.tuple_to_column_matrix(surface[2])
-
-            # Compute the surface normal
-            vp1 = np.subtract(p1, p0)
-            vp2 = np.subtract(p2, p0)
-            n = self.cross(vp1, vp2)
-            l = np.linalg.norm(n)
-            n = n / l
-
             for i in range(0, len(surface_corners)):
-                corners = surface_corners[i]
                 id = surface_ids[i][0]
 
                 # Find it in the markers we generated
                 if id not in self._projected_corners:
                     continue
 
-                for j in range(0, 4):
-                    detected_corner = corners[0][j]
-                    projected_corner = self._projected_corners[id][j]
+                camera_corners.append(np.reshape(surface_corners[i], (4, 2)))
+                image_points.extend(self._projected_corners[id])
+                surface_index.extend([s] * 4)
+
+        if len(camera_corners) == 0:
+            world_points = np.zeros((0, 3))
+            image_points = np.zeros((0, 2))
+        else:
+            # Unproject all corners at once
+            o, d = self._camera_calibration.unproject_many(np.concatenate(camera_corners))
+            surface_index = np.array(surface_index)
+            image_points = np.array(image_points, dtype=np.float64)
+
+            world_points = np.zeros(d.shape)
+            valid = np.zeros(len(d), dtype=bool)
 
-                    o, d = self._camera_calibration.unproject(detected_corner[0], detected_corner[1])
+            for s in range(0, len(self._surfaces)):
+                p0, n = self._surface_plane(self._surfaces[s])
 
-                    # Compute the intersection with the surface
-                    dn = self.dot(d, n)
-                    if dn != 0:
-                        t = self.dot(p0 - o, n) / dn
-                        world_point = self.ray_point(o, d, t)
+                # Compute the intersections with the surface
+                on = surface_index == s
+                dn = d[on] @ n
+                t = np.divide((p0 - o[on]) @ n, dn, out=np.zeros_like(dn), where=dn != 0)
+                world_points[on] = o[on] + d[on] * t[:, np.newaxis]
+                valid[on] = dn != 0
 
-                        world_points.append(world_point)
-                        image_points.append(projected_corner)
+            world_points = world_points[valid]
+            image_points = image_points[valid]
 
         # Now we have the world points and image points, compute the calibration
         if len(self._surfaces) > 1:
@@ -169,6 +209,8 @@ class ProjectorCalibration(Calibration):
         except Exception as err:
             print(f'Calibration failed: {err}')
             return False
+        finally:
+            self._update_state()
 
         self._valid = True
         return True
@@ -181,9 +223,7 @@ class ProjectorCalibration(Calibration):
         :return: True if successful
         '''
         # For now we'll assume this is only for points in the xy plane with Z = 0
-        world_points2d = []
-        for p in world_points:
-            world_points2d.append([p[0], p[1]])
+        world_points2d = np.asarray(world_points)[:, 0:2]
 
         wp = np.array([world_points2d], dtype=np.float32)
         ip = np.array([image_points], dtype=np.float32)
@@ -192,6 +232,7 @@ class ProjectorCalibration(Calibration):
         self.dist = None
         self.rvecs = None
         self.tvecs = None
+        self._update_state()
         # print(M)
         #
         # # Test loop
@@ -209,6 +250,17 @@ class ProjectorCalibration(Calibration):
         return True
 
 
+    @staticmethod
+    def _surface_plane(surface):
+        """
+        Get the plane of a surface from its first three points
+        :param surface: Surface polygon
+        :return: p0, n where p0 is a point on the plane and n the unit normal
+        """
+        p = np.asarray(surface[0:3], dtype=np.float64)
+        n = np.cross(p[1] - p[0], p[2] - p[0])
+        return p[0], n / np.linalg.norm(n)
+
     @staticmethod
     def tuple_to_column_matrix(p):
         return np.array([[p[0]], [p[1]], [p[2]]], dtype=np.float32)
@@ -258,26 +310,27 @@ class ProjectorCalibration(Calibration):
         c = 0
         colors = [(255, 0, 0), (0, 0, 255), (0, 255, 0)]
 
-        # Filter to only those within one of the provided surfaces
-        for surface in self._surfaces:
-            projected = self._project_surface(surface)
-            projected1 = np.array(projected, dtype=np.float32)
-
-            surfaceMarkersCorners = []
-            surfaceMarkersIds = []
-
-            for i in range(0, len(markerCorners)):
-                corners = markerCorners[i]
-                id = markerIds[i]
+        # Look up the surfaces containing every corner in the label mask. A marker
+        # is within a surface if all four of its corners are.
+        labels = self._surface_labels(frame.shape[0], frame.shape[1])
+        if len(markerCorners) > 0:
+            corners = np.rint(np.reshape(np.array(markerCorners), (-1, 2))).astype(np.int64)
+            x = corners[:, 0]
+            y = corners[:, 1]
+            inside = (x >= 0) & (x < labels.shape[1]) & (y >= 0) & (y < labels.shape[0])
+
+            corner_labels = np.zeros(len(corners), dtype=labels.dtype)
+            corner_labels[inside] = labels[y[inside], x[inside]]
+            marker_labels = np.bitwise_and.reduce(corner_labels.reshape(-1, 4), axis=1)
+        else:
+            marker_labels = np.zeros(0, dtype=labels.dtype)
 
-                all = True
-                for corner in corners[0]:
-                    if cv2.pointPolygonTest(projected1, corner, False) < 0:
-                        all = False
+        # Filter to only those within one of the provided surfaces
+        for s in range(0, len(self._surfaces)):
+            members = np.nonzero(marker_labels & (1 << s))[0]
 
-                if all:
-                    surfaceMarkersCorners.append(corners)
-                    surfaceMarkersIds.append(id)
+            surfaceMarkersCorners = [markerCorners[i] for i in members]
+            surfaceMarkersIds = [markerIds[i] for i in members]
 
             surfacesMarkersCorners.append(surfaceMarkersCorners)
             surfacesMarkersIds.append(surfaceMarkersIds)
@@ -290,35 +343,107 @@ class ProjectorCalibration(Calibration):
 
         return surfacesMarkersCorners, surfacesMarkersIds
 
+    def _surface_labels(self, height, width):
+        """
+        Get a label mask at camera resolution where bit s of each pixel
+        is set if the pixel is within surface s. Computed once and cached.
+        :param height: Camera image height
+        :param width: Camera image width
+        :return: Label mask array
+        """
+        labels = self._surface_labels_cache
+        if labels is not None and labels.shape == (height, width):
+            return labels
+
+        count = len(self._surfaces)
+        if count <= 8:
+            dtype = np.uint8
+        elif count <= 16:
+            dtype = np.uint16
+        else:
+            dtype = np.uint64
+
+        labels = np.zeros((height, width), dtype=dtype)
+        layer = np.zeros((height, width), dtype=np.uint8)
+        for s, polygon in enumerate(self._projected_surfaces()):
+            layer[:] = 0
+            cv2.fillPoly(layer, [np.array(polygon, dtype=np.int32)], 1)
+            labels |= layer.astype(dtype) << dtype(s)
+
+        self._surface_labels_cache = labels
+        return labels
+
+    def _projected_surfaces(self):
+        """
+        Get the polygon of each surface in the camera image,
+        computed once and cached
+        :return: List of lists of u, v integer tuples
+        """
+        if self._surface_polygons is None:
+            self._surface_polygons = [self._project_surface(surface) for surface in self._surfaces]
+
+        return self._surface_polygons
+
     def _draw_on_frame(self, frame):
+        """
+        Draw the coordinate axes and the surface outlines on a frame by
+        copying in the pre-rendered overlay
+        :param frame: Camera frame, modified in place
+        :return: The frame
+        """
+        layer, mask = self._overlay(frame.shape)
+        np.copyto(frame, layer, where=mask)
+        return frame
+
+    def _overlay(self, shape):
+        """
+        Get the overlay layer and its mask for a frame shape. The overlay
+        is rendered once and cached until the surfaces or the calibration
+        change. Zoom is applied after the overlay so does not affect it.
+        :param shape: Frame shape
+        :return: Layer of the same shape as the frame and a boolean mask
+            that broadcasts against it
+        """
+        if self._overlay_cache is not None and self._overlay_cache[0].shape == shape:
+            return self._overlay_cache
+
+        # Render on a black and a white background, drawn pixels are the
+        # ones that come out the same in both
+        layer = np.zeros(shape, dtype=np.uint8)
+        self._render_overlay(layer)
+        background = np.full(shape, 255, dtype=np.uint8)
+        self._render_overlay(background)
+
+        mask = (layer == background).reshape(shape[0], shape[1], -1).all(axis=2)
+        if len(shape) == 3:
+            mask = mask[:, :, np.newaxis]
+
+        self._overlay_cache = (layer, mask)
+        return self._overlay_cache
+
+    def _render_overlay(self, image):
+        """
+        Draw the coordinate axes and the surface outlines
+        :param image: Image to draw on
+        """
         cc = self._camera_calibration
-        cv2.drawFrameAxes(frame, cc.mtx, cc.distortion, cc.last_rvec, cc.last_tvec, 0.2)
+        cv2.drawFrameAxes(image, cc.mtx, cc.distortion, cc.last_rvec, cc.last_tvec, 0.2)
 
         c = 0
         colors = [(255, 0, 0), (0, 0, 255), (0, 255, 0)]
 
-        for surface in self._surfaces:
-            projected = self._project_surface(surface)
-
+        for projected in self._projected_surfaces():
             p_last = projected[len(projected) - 1]
             for i in range(0, len(projected)):
                 p = projected[i]
-                cv2.line(frame, p_last, p, colors[c], 4)
+                cv2.line(image, p_last, p, colors[c], 4)
                 p_last = p
 
                 c = (c + 1) % len(colors)
 
-        return frame
-
     def _project_surface(self, surface):
-        projected = []
-
-        for v in surface:
-            p = self._camera_calibration.project(v[0] * 0.001, v[1] * 0.001, v[2] * 0.001)
-            p = (round(p[0]), round(p[1]))
-            projected.append(p)
-
-        return projected
+        projected = self._camera_calibration.project_many(np.asarray(surface, dtype=np.float64) * 0.001)
+        return [(round(p[0]), round(p[1])) for p in projected]
 
     def _project_markers(self):
         fullscreen = FullscreenShow('projector', self._screen_id)
@@ -334,7 +459,56 @@ class ProjectorCalibration(Calibration):
         fullscreen.imshow(image)
 
     def _create_image(self, width, height, size, omits):
-        image = np.ones((height, width), dtype=np.float32)
+        """
+        Get the marker pattern for the projector, from the on disk cache
+        if it has been created before
+        :param width: Projector width
+        :param height: Projector height
+        :param size: Marker size in pixels
+        :param omits: Marker ids that are left out
+        :return: uint8 image and dictionary of marker id to corners
+        """
+        filename = self._marker_cache_file(width, height, size, omits)
+        if filename is not None and os.path.exists(filename):
+            try:
+                with np.load(filename) as data:
+                    image = data['image']
+                    corners = {int(marker_id): c.tolist() for marker_id, c in zip(data['ids'], data['corners'])}
+                    return image, corners
+            except (OSError, ValueError, KeyError) as e:
+                print(f'Unable to read marker cache {filename}: {e}')
+
+        image, corners = self._generate_image(width, height, size, omits)
+
+        if filename is not None:
+            try:
+                os.makedirs(os.path.dirname(filename), exist_ok=True)
+                ids = np.array(list(corners.keys()), dtype=np.int32)
+                table = np.array(list(corners.values()), dtype=np.int32).reshape(-1, 4, 2)
+
+                # Write to a temporary file first so a partial file is never read
+                temp = filename + '.tmp.npz'
+                np.savez(temp, image=image, ids=ids, corners=table)
+                os.replace(temp, filename)
+            except OSError as e:
+                print(f'Unable to write marker cache {filename}: {e}')
+
+        return image, corners
+
+    def _marker_cache_file(self, width, height, size, omits):
+        """
+        Get the cache file for a marker pattern
+        :return: Filename or None if caching is disabled
+        """
+        if self._marker_cache is None:
+            return None
+
+        omits_key = zlib.crc32(','.join(str(o) for o in sorted(omits)).encode())
+        return os.path.join(self._marker_cache,
+                            f'markers-{width}x{height}-{size}-{self._dictionary_id}-{omits_key:08x}.npz')
+
+    def _generate_image(self, width, height, size, omits):
+        image = np.full((height, width), 255, dtype=np.uint8)
         corners = {}
 
         # Spacing between the aruco markers as fraction of size
@@ -352,21 +526,17 @@ class ProjectorCalibration(Calibration):
         border_vertical = int((height - markers_height) / 2)
         border_horizontal = int((width - markers_width) / 2)
 
-        dictionary = cv2.aruco.getPredefinedDictionary(cv2.aruco.DICT_6X6_1000)
-        self._dictionary = dictionary
+        dictionary = self._dictionary
         marker_id = 10
 
-        detectionParams = cv2.aruco.DetectorParameters()
-        self._detector = cv2.aruco.ArucoDetector(dictionary, detectionParams)
-
         row = border_vertical
         while (row + size + spacing) < height:
 
             col = border_horizontal
             while (col + size + spacing) < width:
                 if marker_id not in omits:
-                    marker_image = cv2.aruco.generateImageMarker(dictionary, marker_id, size, None, 1)
-                    image[row:row + size, col:col + size] = marker_image
+                    # Render directly into the pattern
+                    cv2.aruco.generateImageMarker(dictionary, marker_id, size, image[row:row + size, col:col + size], 1)
 
                     corners[marker_id] = [
                         [col, row],
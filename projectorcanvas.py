@@ -0,0 +1,281 @@
+import numpy as np
+import cv2
+from .calibration import Calibration
+
+# Points sampled along each edge of a dirty rectangle to find the
+# projector region it maps to, enough to follow lens distortion
+_EDGE_SAMPLES = 16
+
+# Margin in projector pixels added around a mapped dirty region
+_MARGIN = 2
+
+
+class ProjectorCanvas:
+    """
+    World-space drawing canvas for a calibrated projector.
+
+    Applications draw into a canvas image that covers a rectangle of the
+    world in millimetres. The whole canvas is mapped to the projector in
+    one step: a single cv2.warpPerspective with the calibration homography
+    for 2D calibrations, or a cv2.remap with a cached grid for 3D
+    calibrations, where the canvas lies in the plane z. Only the part of
+    the projector image covered by regions drawn since the last render is
+    mapped again, and nothing is mapped if nothing has changed.
+
+    Drawing through the methods of this class marks the region drawn as
+    dirty. Drawing directly into image must be followed by mark_dirty().
+    """
+
+    def __init__(self, calibration, size, extent, resolution=1.0, z=0.0, channels=3):
+        """
+        Constructor
+        :param calibration: Projector calibration (a Calibration object, in meters)
+        :param size: Projector width, height in pixels, for example FullscreenShow.size
+        :param extent: x0, y0, x1, y1 of the world rectangle covered by the canvas in mm
+        :param resolution: Canvas pixel size in mm
+        :param z: World z of the canvas plane in mm, 3D calibrations only
+        :param channels: 1 for a gray canvas, 3 for BGR
+        """
+        self._calibration = calibration
+        self._width, self._height = int(size[0]), int(size[1])
+        self._x0, self._y0 = float(extent[0]), float(extent[1])
+        self._resolution = float(resolution)
+        self._z = float(z)
+
+        cols = int(np.ceil((extent[2] - extent[0]) / resolution))
+        rows = int(np.ceil((extent[3] - extent[1]) / resolution))
+        shape = (rows, cols) if channels == 1 else (rows, cols, channels)
+        self._image = np.zeros(shape, dtype=np.uint8)
+
+        output_shape = (self._height, self._width) if channels == 1 else (self._height, self._width, channels)
+        self._output = np.zeros(output_shape, dtype=np.uint8)
+
+        # Dirty rectangle in canvas pixels as x0, y0, x1, y1 (exclusive) or None
+        self._dirty = (0, 0, cols, rows)
+
+        # Canvas pixel to projector pixel homography (2D) or remap grid (3D)
+        self._homography = None
+        self._maps = None
+
+        self._renders = 0
+
+    @property
+    def image(self):
+        """
+        The canvas image. Canvas pixel (i, j) is world point
+        x0 + i * resolution, y0 + j * resolution in mm.
+        """
+        return self._image
+
+    @property
+    def output(self):
+        """
+        The projector image as of the last render()
+        """
+        return self._output
+
+    @property
+    def renders(self):
+        """
+        Number of times the canvas has been mapped to the projector
+        """
+        return self._renders
+
+    @property
+    def is_3d(self):
+        return self._calibration.last_rvec is not None
+
+    def to_canvas(self, points):
+        """
+        Convert world points in mm to canvas pixel coordinates
+        :param points: Array of shape (N, 2) of world x, y in mm
+        :return: Array of shape (N, 2) of canvas pixel coordinates
+        """
+        p = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        return (p - (self._x0, self._y0)) / self._resolution
+
+    def _to_pixel(self, point):
+        p = self.to_canvas(point)[0]
+        return int(round(p[0])), int(round(p[1]))
+
+    def clear(self, color=0):
+        """
+        Fill the whole canvas
+        :param color: Gray level or BGR color
+        """
+        self._image[:] = color
+        self.mark_dirty()
+
+    def line(self, p1, p2, color, thickness=1):
+        """
+        Draw a line
+        :param p1: First point x, y in mm
+        :param p2: Second point x, y in mm
+        :param color: Gray level or BGR color
+        :param thickness: Line thickness in canvas pixels
+        """
+        a = self._to_pixel(p1)
+        b = self._to_pixel(p2)
+        cv2.line(self._image, a, b, color, thickness)
+        self._mark_pixels([a, b], thickness)
+
+    def polylines(self, points, color, closed=False, thickness=1):
+        """
+        Draw connected lines
+        :param points: Array of shape (N, 2) of x, y in mm
+        :param color: Gray level or BGR color
+        :param closed: True to connect the last point to the first
+        :param thickness: Line thickness in canvas pixels
+        """
+        pixels = np.rint(self.to_canvas(points)).astype(np.int32)
+        cv2.polylines(self._image, [pixels], closed, color, thickness)
+        self._mark_pixels(pixels, thickness)
+
+    def circle(self, centre, radius, color, thickness=1):
+        """
+        Draw a circle
+        :param centre: Centre x, y in mm
+        :param radius: Radius in mm
+        :param color: Gray level or BGR color
+        :param thickness: Line thickness in canvas pixels, negative to fill
+        """
+        c = self._to_pixel(centre)
+        r = int(round(radius / self._resolution))
+        cv2.circle(self._image, c, r, color, thickness)
+        self._mark_pixels([(c[0] - r, c[1] - r), (c[0] + r, c[1] + r)], thickness)
+
+    def _mark_pixels(self, pixels, thickness):
+        p = np.asarray(pixels).reshape(-1, 2)
+        pad = max(thickness, 1) + 1
+        self.mark_dirty(p[:, 0].min() - pad, p[:, 1].min() - pad, p[:, 0].max() + pad + 1, p[:, 1].max() + pad + 1)
+
+    def mark_dirty(self, x0=None, y0=None, x1=None, y1=None):
+        """
+        Mark a region of the canvas as changed. With no arguments
+        the whole canvas is marked.
+        :param x0, y0, x1, y1: Canvas pixel rectangle, x1 and y1 exclusive
+        """
+        rows, cols = self._image.shape[0:2]
+        if x0 is None:
+            x0, y0, x1, y1 = 0, 0, cols, rows
+
+        x0, y0 = max(int(x0), 0), max(int(y0), 0)
+        x1, y1 = min(int(x1), cols), min(int(y1), rows)
+        if x0 >= x1 or y0 >= y1:
+            return
+
+        if self._dirty is not None:
+            x0, y0 = min(x0, self._dirty[0]), min(y0, self._dirty[1])
+            x1, y1 = max(x1, self._dirty[2]), max(y1, self._dirty[3])
+
+        self._dirty = (x0, y0, x1, y1)
+
+    def invalidate(self):
+        """
+        Discard the cached mapping. Must be called if the calibration changes.
+        """
+        self._homography = None
+        self._maps = None
+        self.mark_dirty()
+
+    def render(self):
+        """
+        Map the changed part of the canvas to the projector image
+        :return: The projector image
+        """
+        if self._dirty is None:
+            return self._output
+
+        u0, v0, u1, v1 = self._output_rect(self._dirty)
+        self._dirty = None
+        if u0 >= u1 or v0 >= v1:
+            return self._output
+
+        if self.is_3d:
+            map1, map2 = self._remap_grid()
+            roi = cv2.remap(self._image, map1[v0:v1, u0:u1], map2[v0:v1, u0:u1], cv2.INTER_LINEAR,
+                            borderMode=cv2.BORDER_CONSTANT)
+        else:
+            # Warp into the region only by shifting the homography
+            shift = np.array([[1, 0, -u0], [0, 1, -v0], [0, 0, 1]], dtype=np.float64)
+            roi = cv2.warpPerspective(self._image, shift @ self._canvas_homography(), (u1 - u0, v1 - v0),
+                                      flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_CONSTANT)
+
+        self._output[v0:v1, u0:u1] = roi.reshape(self._output[v0:v1, u0:u1].shape)
+
+        self._renders += 1
+        return self._output
+
+    def show(self, fullscreen):
+        """
+        Render and show the projector image
+        :param fullscreen: FullscreenShow object for the projector
+        """
+        fullscreen.imshow(self.render())
+
+    def _canvas_homography(self):
+        """
+        Homography from canvas pixels to projector pixels, the projector
+        homography combined with the canvas pixel to meters scale
+        """
+        if self._homography is None:
+            s = self._resolution * 0.001
+            scale = np.array([[s, 0, self._x0 * 0.001], [0, s, self._y0 * 0.001], [0, 0, 1]])
+            self._homography = np.asarray(self._calibration.mtx, dtype=np.float64) @ scale
+
+        return self._homography
+
+    def _remap_grid(self):
+        """
+        Canvas pixel coordinates of every projector pixel, found by
+        intersecting the projector rays with the canvas plane. Computed
+        once and stored in the fixed point format for a faster remap.
+        """
+        if self._maps is None:
+            u, v = np.meshgrid(np.arange(self._width, dtype=np.float64), np.arange(self._height, dtype=np.float64))
+            o, d = self._calibration.unproject_many(np.column_stack((u.ravel(), v.ravel())))
+
+            # Rays parallel to the plane map outside the canvas
+            dz = d[:, 2]
+            t = np.divide(self._z * 0.001 - o[:, 2], dz, out=np.full_like(dz, np.inf), where=dz != 0)
+            with np.errstate(invalid='ignore'):
+                world = (o[:, 0:2] + d[:, 0:2] * t[:, np.newaxis]) * 1000
+            canvas = self.to_canvas(world)
+            canvas[~np.isfinite(canvas).all(axis=1)] = -1
+
+            map_x = canvas[:, 0].reshape(self._height, self._width).astype(np.float32)
+            map_y = canvas[:, 1].reshape(self._height, self._width).astype(np.float32)
+            self._maps = cv2.convertMaps(map_x, map_y, cv2.CV_16SC2)
+
+        return self._maps
+
+    def _output_rect(self, dirty):
+        """
+        Projector pixel rectangle covering a canvas pixel rectangle
+        :param dirty: x0, y0, x1, y1 in canvas pixels
+        :return: u0, v0, u1, v1 clipped to the projector image
+        """
+        x0, y0, x1, y1 = dirty
+        steps = np.linspace(0, 1, _EDGE_SAMPLES)
+        xs = x0 - 1 + (x1 - x0 + 1) * steps
+        ys = y0 - 1 + (y1 - y0 + 1) * steps
+        edges = np.concatenate((np.column_stack((xs, np.full_like(xs, y0 - 1))),
+                                np.column_stack((xs, np.full_like(xs, y1))),
+                                np.column_stack((np.full_like(ys, x0 - 1), ys)),
+                                np.column_stack((np.full_like(ys, x1), ys))))
+
+        if self.is_3d:
+            world = np.column_stack((edges * self._resolution + (self._x0, self._y0), np.full(len(edges), self._z))) * 0.001
+            uv = self._calibration.project_many(world)
+        else:
+            uv = Calibration.apply_homography(self._canvas_homography(), edges)
+
+        uv = uv[np.isfinite(uv).all(axis=1)]
+        if len(uv) == 0:
+            return 0, 0, 0, 0
+
+        u0 = max(int(np.floor(uv[:, 0].min())) - _MARGIN, 0)
+        v0 = max(int(np.floor(uv[:, 1].min())) - _MARGIN, 0)
+        u1 = min(int(np.ceil(uv[:, 0].max())) + _MARGIN + 1, self._width)
+        v1 = min(int(np.ceil(uv[:, 1].max())) + _MARGIN + 1, self._height)
+        return u0, v0, u1, v1
@@ -0,0 +1,97 @@
+import numpy as np
+import cv2
+
+
+class PyramidDetector:
+    """
+    Coarse to fine ArUco marker and ChArUco board detection for high
+    resolution cameras.
+
+    Markers are found in a copy of the frame reduced by a factor of two for
+    each pyramid level, which is where nearly all of the detection cost is,
+    and the marker corners are then refined to sub-pixel precision with
+    cornerSubPix in the full resolution frame. ChArUco corners are
+    interpolated and refined from the refined markers at full resolution.
+    Markers smaller than the detector's minimum size at the reduced
+    resolution are not found.
+
+    detectMarkers and detectBoard have the same interface as
+    cv2.aruco.ArucoDetector and cv2.aruco.CharucoDetector, so a
+    PyramidDetector can replace either.
+    """
+
+    def __init__(self, detector, levels=1):
+        """
+        Constructor
+        :param detector: cv2.aruco.ArucoDetector or cv2.aruco.CharucoDetector
+        :param levels: Number of pyramid levels, the frame is reduced by 2^levels
+        """
+        self._levels = max(0, int(levels))
+        self._factor = 2 ** self._levels
+
+        if isinstance(detector, cv2.aruco.CharucoDetector):
+            self._charuco_detector = detector
+            self._marker_detector = cv2.aruco.ArucoDetector(detector.getBoard().getDictionary(),
+                                                            detector.getDetectorParameters())
+        else:
+            self._charuco_detector = None
+            self._marker_detector = detector
+
+        # The corner error at full resolution is up to about a reduced pixel
+        window = max(5, self._factor + 2)
+        self._window = (window, window)
+        self._criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_COUNT, 30, 0.01)
+
+    @property
+    def levels(self):
+        return self._levels
+
+    def getDetectorParameters(self):
+        return self._marker_detector.getDetectorParameters()
+
+    def detectMarkers(self, image):
+        """
+        Detect markers in a frame
+        :param image: Frame
+        :return: corners, ids, rejected as for cv2.aruco.ArucoDetector.detectMarkers
+        """
+        gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        if self._levels == 0:
+            return self._marker_detector.detectMarkers(gray)
+
+        height, width = gray.shape
+        small = cv2.resize(gray, (width // self._factor, height // self._factor), interpolation=cv2.INTER_AREA)
+        corners, ids, rejected = self._marker_detector.detectMarkers(small)
+
+        # Pixel centres of the reduced image to full resolution coordinates
+        scale = np.array([width / small.shape[1], height / small.shape[0]], dtype=np.float32)
+        rejected = tuple((r + 0.5) * scale - 0.5 for r in rejected)
+        if ids is None or len(corners) == 0:
+            return corners, ids, rejected
+
+        points = ((np.concatenate(corners).reshape(-1, 1, 2) + 0.5) * scale - 0.5).astype(np.float32)
+        cv2.cornerSubPix(gray, points, self._window, (-1, -1), self._criteria)
+
+        corners = tuple(points.reshape(-1, 1, 4, 2))
+        return corners, ids, rejected
+
+    def detectBoard(self, image):
+        """
+        Detect the ChArUco board in a frame
+        :param image: Frame
+        :return: charucoCorners, charucoIds, markerCorners, markerIds as for
+            cv2.aruco.CharucoDetector.detectBoard
+        :raises TypeError: If the detector wrapped is not a CharucoDetector
+        """
+        if self._charuco_detector is None:
+            raise TypeError('detectBoard requires a PyramidDetector constructed with a cv2.aruco.CharucoDetector')
+
+        gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        if self._levels == 0:
+            return self._charuco_detector.detectBoard(gray)
+
+        markerCorners, markerIds, rejected = self.detectMarkers(gray)
+        if markerIds is None or len(markerCorners) == 0:
+            return None, None, markerCorners, markerIds
+
+        return self._charuco_detector.detectBoard(gray, markerCorners=list(markerCorners), markerIds=markerIds)
@@ -0,0 +1,181 @@
+import numpy as np
+import cv2
+
+
+class RoiDetector:
+    """
+    ArUco marker detection that only searches where markers are expected.
+
+    The region of each marker is predicted from its corners in the last two
+    frames, and markers are detected in padded regions of interest around
+    the predictions instead of the whole frame. The whole frame is scanned
+    every rescan frames, when nothing is being tracked, and whenever a
+    tracked marker is not found in its region, so markers that appear are
+    picked up at the next rescan and markers that are lost are searched
+    for at once.
+
+    detectMarkers has the same interface as cv2.aruco.ArucoDetector, so a
+    RoiDetector can replace one.
+    """
+
+    def __init__(self, detector, rescan=10, padding=0.5, min_padding=16):
+        """
+        Constructor
+        :param detector: cv2.aruco.ArucoDetector to detect with
+        :param rescan: Interval in frames between full frame scans
+        :param padding: Padding around each predicted marker as a fraction of its size
+        :param min_padding: Minimum padding in pixels
+        """
+        self._detector = detector
+        self._rescan = max(1, int(rescan))
+        self._padding = padding
+        self._min_padding = min_padding
+
+        # Corners of each tracked marker in the last frame and the one before
+        self._last = {}
+        self._previous = {}
+
+        self._frame = 0
+        self._full_scans = 0
+        self._roi_scans = 0
+        self._scanned = 0
+
+    @property
+    def detector(self):
+        return self._detector
+
+    @property
+    def full_scans(self):
+        """
+        Number of frames the whole frame was scanned
+        """
+        return self._full_scans
+
+    @property
+    def roi_scans(self):
+        """
+        Number of frames detected in regions of interest only
+        """
+        return self._roi_scans
+
+    @property
+    def scanned(self):
+        """
+        Total number of pixels scanned
+        """
+        return self._scanned
+
+    def reset(self):
+        """
+        Forget the tracked markers, the next frame is scanned in full
+        """
+        self._last = {}
+        self._previous = {}
+
+    def detectMarkers(self, image):
+        """
+        Detect markers in a frame
+        :param image: Frame
+        :return: corners, ids, rejected as for cv2.aruco.ArucoDetector.detectMarkers
+        """
+        height, width = image.shape[0:2]
+
+        result = None
+        if len(self._last) > 0 and self._frame % self._rescan != 0:
+            result = self._detect_rois(image, width, height)
+
+        if result is None:
+            result = self._detector.detectMarkers(image)
+            self._full_scans += 1
+            self._scanned += width * height
+
+        self._frame += 1
+
+        corners, ids, rejected = result
+        self._previous = self._last
+        self._last = {}
+        if ids is not None:
+            for c, marker_id in zip(corners, ids.reshape(-1)):
+                self._last[int(marker_id)] = c.reshape(4, 2)
+
+        return result
+
+    def _detect_rois(self, image, width, height):
+        """
+        Detect markers in the predicted regions
+        :return: corners, ids, rejected or None if a tracked marker was not found
+        """
+        corners = []
+        ids = []
+        rejected = []
+        found = set()
+
+        # The minimum marker size is relative to the image size, apply
+        # the full frame limit to the markers found in the regions
+        min_perimeter = self._detector.getDetectorParameters().minMarkerPerimeterRate * max(width, height)
+
+        for x0, y0, x1, y1 in self._regions(width, height):
+            roi = image[y0:y1, x0:x1]
+            roi_corners, roi_ids, roi_rejected = self._detector.detectMarkers(roi)
+            self._scanned += (x1 - x0) * (y1 - y0)
+
+            offset = np.array([x0, y0], dtype=np.float32)
+            rejected.extend(r + offset for r in roi_rejected)
+            if roi_ids is None:
+                continue
+
+            for c, marker_id in zip(roi_corners, roi_ids.reshape(-1)):
+                marker_id = int(marker_id)
+                if marker_id in found:
+                    continue
+
+                c = c + offset
+                if cv2.arcLength(c.reshape(-1, 1, 2), True) < min_perimeter:
+                    continue
+
+                found.add(marker_id)
+                corners.append(c)
+                ids.append([marker_id])
+
+        if not set(self._last.keys()).issubset(found):
+            return None
+
+        self._roi_scans += 1
+        return tuple(corners), np.array(ids, dtype=np.int32), tuple(rejected)
+
+    def _regions(self, width, height):
+        """
+        Padded regions around the predicted marker positions, overlapping
+        regions merged
+        :return: List of x0, y0, x1, y1 rectangles
+        """
+        regions = []
+        for marker_id, c in self._last.items():
+            # Constant velocity prediction of the corners
+            previous = self._previous.get(marker_id)
+            predicted = c if previous is None else c + (c - previous)
+
+            lo = np.minimum(predicted.min(axis=0), c.min(axis=0))
+            hi = np.maximum(predicted.max(axis=0), c.max(axis=0))
+            pad = max(self._min_padding, self._padding * max(hi - lo))
+
+            regions.append([max(int(lo[0] - pad), 0), max(int(lo[1] - pad), 0),
+                            min(int(np.ceil(hi[0] + pad)), width), min(int(np.ceil(hi[1] + pad)), height)])
+
+        # Merge until no regions overlap, so no marker is cut by a region edge
+        merged = True
+        while merged:
+            merged = False
+            for i in range(0, len(regions)):
+                for j in range(i + 1, len(regions)):
+                    a, b = regions[i], regions[j]
+                    if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+                        regions[i] = [min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])]
+                        del regions[j]
+                        merged = True
+                        break
+
+                if merged:
+                    break
+
+        return regions
@@ -1,9 +1,15 @@
 from abc import ABC, abstractmethod
+import contextlib
+import threading
+import time
 import cv2
 
 from .generalcamera import GeneralCamera
 from .exceptions import OpenFailedException
 from .streamerconfig import StreamerConfig
+from .keysource import KeySource, HighGuiKeySource, NO_KEY
+from .framequeue import FrameQueue
+from .streamerstats import StreamerStats
 
 class Streamer(ABC):
     """
@@ -11,6 +17,26 @@ class Streamer(ABC):
     a live camera or movie file. Meant to simplify applications that
     need to read from a file for development, then be subject to
     deployment with a live camera.
+
+    In headless mode (StreamerConfig.headless) the loop does not use
+    HighGUI. Keys then come from the key source selected by
+    StreamerConfig.keys, or one assigned to the key_source property.
+
+    In pipelined mode (StreamerConfig.pipeline) frames are read on a
+    separate thread and passed to on_frame, in order, through a bounded
+    queue, so decoding overlaps processing. on_frame and key handling stay
+    on the calling thread, as HighGUI requires.
+
+    StreamerConfig.overflow selects what happens when on_frame is slower
+    than the source, see FrameQueue. The drop policies only apply when
+    pipelined; every-nth also applies to sequential reading. The
+    frames_processed and frames_dropped properties count the outcome and
+    frame_number is always the number of the frame in the source.
+
+    With StreamerConfig.instrument set, the time spent reading frames,
+    in on_frame and polling keys, the latency from capture to the end of
+    on_frame and a rolling frame rate are recorded, see the stats property.
+    Subclasses can time their own stages with timed().
     """
 
     def __init__(self, docopt_args):
@@ -22,6 +48,13 @@ class Streamer(ABC):
         self._frame_number = 0
         self._pause_key = None
         self._running = False
+        self._key_source = None
+
+        self._frame_queue = None
+        self._frames_processed = 0
+        self._frames_dropped = 0
+
+        self._stats = None
 
     def start(self):
         self.on_start()
@@ -31,7 +64,8 @@ class Streamer(ABC):
         dir = config.dir
 
         if config.camera is not None:
-            device = GeneralCamera(gain=0, frame_rate=30, camera=config.camera)
+            device = GeneralCamera(gain=0, frame_rate=30, camera=config.camera,
+                                   threaded=config.camera_threaded, latest=config.camera_latest)
             if not device.open():
                 raise OpenFailedException(f"Unable to open camera {config.camera}")
 
@@ -40,34 +74,208 @@ class Streamer(ABC):
             if not device.isOpened():
                 raise OpenFailedException(f"Unable to open movie {config.movie}")
 
+        if self._key_source is None:
+            if config.headless:
+                self._key_source = KeySource.create(config.keys)
+            else:
+                self._key_source = HighGuiKeySource()
+
+        keys = self._key_source
+
+        if config.instrument:
+            self._stats = StreamerStats(filename=config.instrument_file,
+                                        interval=config.instrument_interval)
+        stats = self._stats
+
         if device is not None:
             self._running = True
+            self._frames_processed = 0
+            self._frames_dropped = 0
 
-            while self._running:
-                ret, frame = device.read()
+            if config.pipeline:
+                frames = self._pipelined_frames(device)
+            else:
+                frames = self._frames(device)
+
+            try:
+                for frame_number, frame, capture_time in frames:
+                    self._frame_number = frame_number
+                    self._frames_processed += 1
+
+                    if stats is None:
+                        self.on_frame(frame)
+                        self._poll_keys(keys, frame)
+                    else:
+                        start = time.perf_counter()
+                        self.on_frame(frame)
+                        end = time.perf_counter()
+                        stats.record('on_frame', end - start)
+                        stats.frame_done(capture_time, end)
+
+                        self._poll_keys(keys, frame)
+                        stats.record('keys', time.perf_counter() - end)
+
+                    if not self._running:
+                        break
+            finally:
+                frames.close()
+
+                # Also stops a threaded camera's acquisition thread
+                Streamer._release(device)
+
+            self._running = False
+
+        keys.close()
+
+        if stats is not None and config.instrument_file is not None:
+            stats.write(config.instrument_file)
+
+        self.on_stop()
+
+    @staticmethod
+    def _release(device):
+        if isinstance(device, GeneralCamera):
+            device.close()
+        else:
+            device.release()
+
+    @staticmethod
+    def _capture_time(device, start):
+        """
+        Time a frame just read was captured. A GeneralCamera records when
+        the frame was acquired, which includes any time it then waited in
+        the threaded ring buffer. For other devices it is the time the
+        read started.
+        :param start: time.perf_counter() before the read
+        """
+        timestamp = getattr(device, 'timestamp', None)
+        return start if timestamp is None else timestamp
+
+    def _frames(self, device):
+        """
+        Generator for frames read sequentially from the device
+        :return: Yields frame number, frame, capture time
+        """
+        config = self._config
+        nth = config.every if config.overflow == FrameQueue.EVERY_NTH else 1
+        frame_number = self._frame_number
+
+        while self._running:
+            frame_number += 1
+            if (frame_number - 1) % nth != 0:
+                # Skipped frame, avoid decoding it if the source allows
+                ret = device.grab() if hasattr(device, 'grab') else device.read()[0]
                 if not ret:
-                    self._running = False
                     break
 
-                self._frame_number += 1
+                self._frames_dropped += 1
+                continue
 
-                self.on_frame(frame)
-                key = cv2.waitKey(1) & 0xff
-                if not self.on_key(key, frame):
-                    if key == ord('q') or key == 27:
-                        self._running = False
+            start = time.perf_counter()
+            ret, frame = device.read()
+            end = time.perf_counter()
+            if not ret:
+                break
 
-                    elif key == self._pause_key:
-                        while self._running:
-                            key = cv2.waitKey(0) & 0xff
-                            if not self.on_key(key, frame):
-                                if key == ord('q') or key == 27:
-                                    self._running = False
+            if self._stats is not None:
+                self._stats.record('read', end - start)
 
-                                elif key == self._pause_key:
-                                    break
+            capture_time = Streamer._capture_time(device, start)
 
-        self.on_stop()
+            yield frame_number, frame, capture_time
+
+    def _pipelined_frames(self, device):
+        """
+        Generator for frames read from the device on a separate thread,
+        so reading the next frame overlaps the processing of this one.
+        Frames are passed in order through a bounded FrameQueue that
+        applies the overflow policy.
+        :return: Yields frame number, frame, capture time
+        """
+        config = self._config
+        frames = FrameQueue(config.queue_size, config.overflow, config.every)
+        self._frame_queue = frames
+        frame_number = self._frame_number
+        stats = self._stats
+
+        def read():
+            nonlocal frame_number
+            try:
+                while not frames.closed:
+                    start = time.perf_counter()
+                    ret, frame = device.read()
+                    end = time.perf_counter()
+                    if not ret:
+                        break
+
+                    if stats is not None:
+                        stats.record('read', end - start)
+
+                    capture_time = Streamer._capture_time(device, start)
+
+                    frame_number += 1
+                    frames.put((frame_number, frame, capture_time))
+            finally:
+                # Closing marks the end of the stream
+                frames.close()
+
+        thread = threading.Thread(target=read, name='Streamer', daemon=True)
+        thread.start()
+
+        try:
+            while self._running:
+                item = frames.get()
+                if item is None:
+                    break
+
+                yield item
+        finally:
+            frames.close()
+            thread.join()
+            self._frames_dropped += frames.dropped
+            self._frame_queue = None
+
+    def _poll_keys(self, keys, frame):
+        key = keys.poll(self._frame_number)
+        if not self.on_key(key, frame):
+            if key == ord('q') or key == 27:
+                self._running = False
+
+            elif key == self._pause_key:
+                while self._running:
+                    key = keys.poll(self._frame_number, block=True)
+                    if key == NO_KEY:
+                        # The key source cannot wait, resume
+                        break
+
+                    if not self.on_key(key, frame):
+                        if key == ord('q') or key == 27:
+                            self._running = False
+
+                        elif key == self._pause_key:
+                            break
+
+    @contextlib.contextmanager
+    def timed(self, stage):
+        """
+        Context manager that records the time spent in the block as a
+        stage when instrumentation is enabled, for example:
+
+            with self.timed('display'):
+                cv2.imshow('Video Stream', frame)
+
+        :param stage: Stage name
+        """
+        stats = self._stats
+        if stats is None:
+            yield
+            return
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            stats.record(stage, time.perf_counter() - start)
 
     def on_start(self):
         pass
@@ -94,6 +302,62 @@ class Streamer(ABC):
     def movie(self):
         return self._config.movie
 
+    @property
+    def frames_processed(self):
+        """
+        Number of frames passed to on_frame by the last start()
+        """
+        return self._frames_processed
+
+    @property
+    def frames_dropped(self):
+        """
+        Number of frames read from the source but not passed to on_frame
+        because of the overflow policy
+        """
+        frame_queue = self._frame_queue
+        if frame_queue is not None:
+            return self._frames_dropped + frame_queue.dropped
+
+        return self._frames_dropped
+
+    @property
+    def stats(self):
+        """
+        Summary of the recorded timing, see StreamerStats.summary(),
+        or None if instrumentation is not enabled
+        """
+        if self._stats is None:
+            return None
+
+        return self._stats.summary()
+
+    @property
+    def fps(self):
+        """
+        Rolling frame rate, 0 if instrumentation is not enabled
+        """
+        if self._stats is None:
+            return 0.0
+
+        return self._stats.fps
+
+    @property
+    def overflow(self):
+        return self._config.overflow
+
+    @property
+    def headless(self):
+        return self._config.headless
+
+    @property
+    def key_source(self):
+        return self._key_source
+
+    @key_source.setter
+    def key_source(self, key_source):
+        self._key_source = key_source
+
     @property
     def frame_number(self):
         return self._frame_number
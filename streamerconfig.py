@@ -1,6 +1,8 @@
 import json
 import os
 
+from .framequeue import FrameQueue
+
 class StreamerConfig:
     """
     Configuration data for streamer system
@@ -9,6 +11,17 @@ class StreamerConfig:
         self._camera = None         # Camera to use if camera option selected
         self._movie = None          # Movie to use if movie option selected
         self._zoom = 1.0           # Zoom factor to use
+        self._camera_threaded = False   # Acquire camera frames on a background thread
+        self._camera_latest = True      # Threaded camera returns the latest frame rather than every frame
+        self._headless = False      # Run without HighGUI windows or cv2.waitKey
+        self._keys = None           # Headless key source: none, stdin or a script
+        self._pipeline = False      # Read frames on a separate thread
+        self._queue_size = 4        # Frames queued between reading and processing
+        self._overflow = FrameQueue.BLOCK   # Policy when processing falls behind
+        self._every = 1             # Frame interval for the every-nth policy
+        self._instrument = False    # Record per-stage timing
+        self._instrument_file = None    # Optional JSON lines file for timing
+        self._instrument_interval = 1.0     # Seconds between timing lines
 
         self._config_file = config_file
         self._docopt_args = docopt_args
@@ -32,6 +45,40 @@ class StreamerConfig:
             if 'zoom' in self._config:
                 self._zoom = float(self._config['zoom'])
 
+            if 'camera-threaded' in self._config:
+                self._camera_threaded = bool(self._config['camera-threaded'])
+
+            if 'camera-latest' in self._config:
+                self._camera_latest = bool(self._config['camera-latest'])
+
+            if 'headless' in self._config:
+                self._headless = bool(self._config['headless'])
+
+            if 'keys' in self._config:
+                self._keys = self._config['keys']
+
+            if 'pipeline' in self._config:
+                self._pipeline = bool(self._config['pipeline'])
+
+            if 'queue-size' in self._config:
+                self._queue_size = max(1, int(self._config['queue-size']))
+
+            if 'overflow' in self._config:
+                self.overflow = self._config['overflow']
+
+            if 'every' in self._config:
+                self.every = self._config['every']
+
+            if 'instrument' in self._config:
+                self._instrument = bool(self._config['instrument'])
+
+            if 'instrument-file' in self._config:
+                self._instrument_file = self._dir + self._config['instrument-file']
+                self._instrument = True
+
+            if 'instrument-interval' in self._config:
+                self._instrument_interval = float(self._config['instrument-interval'])
+
         else:
             self._dir = os.getcwd()
             self._config = {}
@@ -45,6 +92,31 @@ class StreamerConfig:
             self._movie = docopt_args['--movie']
             self._camera = None
 
+        if '--camera-threaded' in docopt_args and docopt_args['--camera-threaded']:
+            self._camera_threaded = True
+
+        if '--headless' in docopt_args and docopt_args['--headless']:
+            self._headless = True
+
+        if '--keys' in docopt_args and docopt_args['--keys'] is not None:
+            self._keys = docopt_args['--keys']
+
+        if '--pipeline' in docopt_args and docopt_args['--pipeline']:
+            self._pipeline = True
+
+        if '--overflow' in docopt_args and docopt_args['--overflow'] is not None:
+            self.overflow = docopt_args['--overflow']
+
+        if '--every' in docopt_args and docopt_args['--every'] is not None:
+            self.every = docopt_args['--every']
+
+        if '--instrument' in docopt_args and docopt_args['--instrument']:
+            self._instrument = True
+
+        if '--instrument-file' in docopt_args and docopt_args['--instrument-file'] is not None:
+            self._instrument_file = docopt_args['--instrument-file']
+            self._instrument = True
+
         # Default to camera 1 if none provided
         if self._camera is None and self._movie is None:
             self._camera = 1
@@ -97,4 +169,97 @@ class StreamerConfig:
 
     @zoom.setter
     def zoom(self, value):
-        self._zoom = float(value)
\ No newline at end of file
+        self._zoom = float(value)
+
+    @property
+    def camera_threaded(self):
+        return self._camera_threaded
+
+    @camera_threaded.setter
+    def camera_threaded(self, value):
+        self._camera_threaded = value
+
+    @property
+    def camera_latest(self):
+        return self._camera_latest
+
+    @camera_latest.setter
+    def camera_latest(self, value):
+        self._camera_latest = value
+
+    @property
+    def headless(self):
+        return self._headless
+
+    @headless.setter
+    def headless(self, value):
+        self._headless = value
+
+    @property
+    def keys(self):
+        return self._keys
+
+    @keys.setter
+    def keys(self, value):
+        self._keys = value
+
+    @property
+    def pipeline(self):
+        return self._pipeline
+
+    @pipeline.setter
+    def pipeline(self, value):
+        self._pipeline = value
+
+    @property
+    def queue_size(self):
+        return self._queue_size
+
+    @queue_size.setter
+    def queue_size(self, value):
+        self._queue_size = max(1, int(value))
+
+    @property
+    def overflow(self):
+        return self._overflow
+
+    @overflow.setter
+    def overflow(self, value):
+        if value not in FrameQueue.POLICIES:
+            raise ValueError(f"Unknown frame overflow policy {value}")
+
+        self._overflow = value
+
+    @property
+    def every(self):
+        return self._every
+
+    @every.setter
+    def every(self, value):
+        self._every = max(1, int(value))
+
+    @property
+    def instrument(self):
+        return self._instrument
+
+    @instrument.setter
+    def instrument(self, value):
+        self._instrument = value
+
+    @property
+    def instrument_file(self):
+        return self._instrument_file
+
+    @instrument_file.setter
+    def instrument_file(self, value):
+        self._instrument_file = value
+        if value is not None:
+            self._instrument = True
+
+    @property
+    def instrument_interval(self):
+        return self._instrument_interval
+
+    @instrument_interval.setter
+    def instrument_interval(self, value):
+        self._instrument_interval = float(value)
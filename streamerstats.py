@@ -0,0 +1,160 @@
+import collections
+import json
+import math
+import threading
+import time
+
+# Number of power of two histogram buckets. Bucket i counts durations
+# from 2^(i-1) to 2^i microseconds, the last bucket everything longer.
+_BUCKETS = 32
+
+
+class StageTiming:
+    """
+    Latency histogram and totals for one stage of frame processing
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        self.buckets = [0] * _BUCKETS
+
+    def record(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+
+        # Exponent of the duration in microseconds selects the bucket
+        exponent = math.frexp(seconds * 1e6)[1]
+        self.buckets[min(max(exponent, 0), _BUCKETS - 1)] += 1
+
+    def percentile(self, p):
+        """
+        Approximate percentile from the histogram
+        :param p: Percentile from 0 to 100
+        :return: Upper bound of the bucket holding the percentile in seconds
+        """
+        if self.count == 0:
+            return 0.0
+
+        target = self.count * p / 100.0
+        seen = 0
+        for i in range(0, _BUCKETS):
+            seen += self.buckets[i]
+            if seen >= target:
+                return min(math.ldexp(1.0, i) * 1e-6, self.max)
+
+        return self.max
+
+    def summary(self):
+        """
+        Summary of the stage in milliseconds
+        :return: Dictionary
+        """
+        if self.count == 0:
+            return {'count': 0}
+
+        return {'count': self.count,
+                'mean_ms': 1000 * self.total / self.count,
+                'min_ms': 1000 * self.min,
+                'max_ms': 1000 * self.max,
+                'p50_ms': 1000 * self.percentile(50),
+                'p90_ms': 1000 * self.percentile(90),
+                'p99_ms': 1000 * self.percentile(99),
+                'histogram_us': {str(2 ** i): n for i, n in enumerate(self.buckets) if n > 0}}
+
+
+class StreamerStats:
+    """
+    Per-stage timing, rolling frame rate and end-to-end latency for Streamer.
+
+    Stages are named, for example 'read', 'on_frame' and 'keys'. The
+    'latency' stage is the time from frame capture to the completion of
+    on_frame. Optionally a summary is appended to a JSON lines file at
+    a set interval.
+    """
+
+    def __init__(self, fps_window=30, filename=None, interval=1.0):
+        """
+        Constructor
+        :param fps_window: Number of frames the rolling frame rate is computed over
+        :param filename: Optional JSON lines file summaries are appended to
+        :param interval: Interval in seconds between summaries written to the file
+        """
+        self._stages = {}
+        self._lock = threading.Lock()
+        self._completions = collections.deque(maxlen=max(2, fps_window))
+        self._filename = filename
+        self._interval = interval
+        self._last_write = time.perf_counter()
+
+    def record(self, stage, seconds):
+        """
+        Record the duration of a stage
+        :param stage: Stage name
+        :param seconds: Duration in seconds
+        """
+        timing = self._stages.get(stage)
+        if timing is None:
+            with self._lock:
+                timing = self._stages.setdefault(stage, StageTiming())
+
+        timing.record(seconds)
+
+    def frame_done(self, capture_time, now):
+        """
+        Record the completion of processing for a frame
+        :param capture_time: time.perf_counter() when the frame was captured
+        :param now: time.perf_counter() when processing completed
+        """
+        self.record('latency', now - capture_time)
+        self._completions.append(now)
+
+        if self._filename is not None and now - self._last_write >= self._interval:
+            self._last_write = now
+            self.write(self._filename)
+
+    def write(self, filename):
+        """
+        Append the current summary as one JSON line
+        :param filename: File to append to
+        """
+        summary = self.summary()
+        summary['time'] = time.time()
+        with open(filename, "a") as f:
+            f.write(json.dumps(summary) + '\n')
+
+    def summary(self):
+        """
+        Summary of all stages
+        :return: Dictionary with the frame rate and a summary per stage
+        """
+        with self._lock:
+            stages = list(self._stages.items())
+
+        return {'fps': self.fps,
+                'stages': {name: timing.summary() for name, timing in stages}}
+
+    @property
+    def fps(self):
+        """
+        Frame rate over the last fps_window completed frames
+        """
+        completions = list(self._completions)
+        if len(completions) < 2 or completions[-1] == completions[0]:
+            return 0.0
+
+        return (len(completions) - 1) / (completions[-1] - completions[0])
+
+    def stage(self, stage):
+        """
+        Get the timing for a stage
+        :param stage: Stage name
+        :return: StageTiming object or None if the stage has not been recorded
+        """
+        return self._stages.get(stage)
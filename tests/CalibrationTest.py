@@ -8,6 +8,7 @@ import unittest
 from abilities import Calibration
 import numpy as np
 import math
+import tempfile
 
 class CalibrationTest(unittest.TestCase):
     def __init__(self, methodName='runTest'):
@@ -24,6 +25,32 @@ class CalibrationTest(unittest.TestCase):
             np.allclose(calibration.imsize, [1080, 1920]),
                            msg="Image size read")
 
+    def test_binary(self):
+        for name in ["calibration.yaml.dat", "calibration2d.yaml.dat"]:
+            calibration = Calibration()
+            calibration.read(self._dir + "/data/" + name)
+
+            with tempfile.TemporaryDirectory() as dir:
+                filename = os.path.join(dir, "calibration.npz")
+                calibration.write(filename)
+
+                calibration2 = Calibration()
+                self.assertTrue(calibration2.read(filename))
+
+            self.assertTrue(calibration2.valid)
+            self.assertTrue(np.array_equal(calibration.imsize, calibration2.imsize))
+            self.assertTrue(np.array_equal(calibration.mtx, calibration2.mtx))
+
+            if calibration.rvecs.dtype == object:
+                # 2D calibration has no distortion or pose
+                self.assertIsNone(calibration2.dist)
+                self.assertIsNone(calibration2.rvecs)
+                self.assertIsNone(calibration2.tvecs)
+            else:
+                self.assertTrue(np.array_equal(calibration.dist, calibration2.dist))
+                self.assertTrue(np.array_equal(calibration.rvecs, calibration2.rvecs))
+                self.assertTrue(np.array_equal(calibration.tvecs, calibration2.tvecs))
+
     def test_project(self):
         calibration = Calibration()
         calibration.read(self._dir + "/data/calibration.yaml.dat")
@@ -38,6 +65,27 @@ class CalibrationTest(unittest.TestCase):
         self.assertAlmostEqual(u, 122.20530471183292, 5)
         self.assertAlmostEqual(v, 113.11239784085149, 5)
 
+    def test_project_many(self):
+        calibration = Calibration()
+        calibration.read(self._dir + "/data/calibration.yaml.dat")
+
+        points = np.array([[0.01890533, 0.12916625, 0.00284014],
+                           [-0.05214326, -0.03002264, -0.00936422]])
+
+        rng = np.random.default_rng(7)
+        points = np.vstack((points, rng.uniform(-0.1, 0.1, (50, 3))))
+
+        projected = calibration.project_many(points)
+        self.assertEqual(projected.shape, (len(points), 2))
+
+        self.assertAlmostEqual(projected[0][0], 385.8566745633289, 5)
+        self.assertAlmostEqual(projected[0][1], 699.1137169777264, 5)
+
+        for i in range(0, len(points)):
+            u, v = calibration.project(points[i][0], points[i][1], points[i][2])
+            self.assertTrue(np.allclose(projected[i], [u, v], rtol=0, atol=1e-9),
+                            msg="project_many matches project")
+
     def test_project2d(self):
         calibration = Calibration()
         calibration.read(self._dir + "/data/calibration2d.yaml.dat")
@@ -64,6 +112,25 @@ class CalibrationTest(unittest.TestCase):
             self.assertAlmostEqual(x, x0, 5)
             self.assertAlmostEqual(y, x1, 5)
 
+    def test_project2d_many(self):
+        calibration = Calibration()
+        calibration.read(self._dir + "/data/calibration2d.yaml.dat")
+
+        points = np.array([[0.0, 0.0], [112, 78], [-182.7, -53.1], [0.30, 0.20]])
+        projected = calibration.project2d_many(points)
+        self.assertEqual(projected.shape, (len(points), 2))
+
+        for i in range(0, len(points)):
+            u, v = calibration.project2d(points[i][0], points[i][1])
+            self.assertTrue(np.allclose(projected[i], [u, v], rtol=0, atol=1e-9))
+
+        unprojected = calibration.unproject2d_many(projected)
+        for i in range(0, len(points)):
+            x, y = calibration.unproject2d(projected[i][0], projected[i][1])
+            self.assertTrue(np.allclose(unprojected[i], [x, y], rtol=0, atol=1e-9))
+
+        self.assertTrue(np.allclose(unprojected, points, rtol=0, atol=1e-5))
+
     def test_unproject(self):
         calibration = Calibration()
         calibration.read(self._dir + "/data/calibration.yaml.dat")
@@ -80,6 +147,63 @@ class CalibrationTest(unittest.TestCase):
         self.assertAlmostEqual(p[1][0], -0.03002264, 5)
         self.assertAlmostEqual(p[2][0], -0.00936422, 5)
 
+    def test_unproject_many(self):
+        calibration = Calibration()
+        calibration.read(self._dir + "/data/calibration.yaml.dat")
+
+        uv = np.array([[385.8566745633289, 699.1137169777264],
+                       [122.20530471183292, 113.11239784085149],
+                       [0.0, 0.0],
+                       [1919.0, 1079.0]])
+        o, d = calibration.unproject_many(uv)
+        self.assertEqual(o.shape, (len(uv), 3))
+        self.assertEqual(d.shape, (len(uv), 3))
+
+        for i in range(0, len(uv)):
+            o1, d1 = calibration.unproject(uv[i][0], uv[i][1])
+            self.assertTrue(np.allclose(o[i], o1.ravel(), rtol=0, atol=1e-9))
+            self.assertTrue(np.allclose(d[i], d1.ravel(), rtol=0, atol=1e-9))
+
+        p = calibration.ray_intersect_xy(o[0].reshape(3, 1), d[0].reshape(3, 1), 0.00284014)
+        self.assertAlmostEqual(p[0][0], 0.01890533, 5)
+        self.assertAlmostEqual(p[1][0], 0.12916625, 5)
+
+        # The origins can be modified like those from unproject()
+        o[0] += 1.0
+        self.assertTrue(np.allclose(o[1], o1.ravel(), rtol=0, atol=1e-9))
+
+        o, d = calibration.unproject_many(np.empty((0, 2)))
+        self.assertEqual(o.shape, (0, 3))
+        self.assertEqual(d.shape, (0, 3))
+
+    def test_cached_state(self):
+        calibration = Calibration()
+        calibration.read(self._dir + "/data/calibration.yaml.dat")
+
+        t, r = calibration.lastPose()
+        self.assertIs(r, calibration.lastPose()[1])
+        self.assertTrue(np.allclose(r @ r.T, np.eye(3)))
+
+        # The cached state is immutable
+        with self.assertRaises(ValueError):
+            r[0][0] = 1.0
+
+        # Changing the calibration invalidates the cached state
+        calibration.set(calibration.imsize, calibration.mtx, calibration.dist,
+                        calibration.rvecs[0:1], calibration.tvecs[0:1])
+        self.assertTrue(np.allclose(calibration.last_rvec, calibration.rvecs[0]))
+        self.assertTrue(np.allclose(calibration.last_tvec, calibration.tvecs[0]))
+        self.assertIsNot(r, calibration.lastPose()[1])
+
+        # The snapshot holds its own copy of the intrinsics
+        state = calibration._state()
+        self.assertTrue(np.array_equal(state.mtx, calibration.mtx))
+        self.assertFalse(state.mtx.flags.writeable)
+        u, v = calibration.project(0.01, 0.1, 0.0)
+        calibration.mtx[0][0] *= 2
+        self.assertEqual(calibration.project(0.01, 0.1, 0.0), (u, v))
+        self.assertIs(calibration._state(), state)
+
     def test_angle(self):
         calibration = Calibration()
         calibration.read(self._dir + "/data/calibration-lab.yaml.dat")
@@ -0,0 +1,233 @@
+import sys
+import os
+
+# Add the parent directory of the current script to sys.path
+sys.path.append(os.path.abspath(os.path.join(__file__, os.pardir, os.pardir, os.pardir)))
+
+import unittest
+import threading
+import tempfile
+import cv2
+import numpy as np
+from abilities import CameraCalibration
+
+
+class CameraCalibrationTest(unittest.TestCase):
+    """
+    Tests using synthetic views of the calibration board rendered
+    through a known camera
+    """
+
+    # Camera used to render the views
+    mtx = np.array([[900.0, 0, 640], [0, 900.0, 480], [0, 0, 1]])
+    imsize = (1280, 960)
+
+    # Board image size and pixel size in meters
+    board_pixels = (1000, 800)
+    board_scale = 0.25 / 1000
+
+    poses = [((0.3, 0.1, 0.0), (-0.12, -0.1, 0.55)),
+             ((-0.3, 0.2, 0.1), (-0.13, -0.09, 0.5)),
+             ((0.1, -0.35, -0.1), (-0.11, -0.1, 0.6)),
+             ((-0.2, -0.25, 0.2), (-0.12, -0.12, 0.5)),
+             ((0.35, 0.3, 0.05), (-0.14, -0.1, 0.58)),
+             ((0.0, 0.0, 0.3), (-0.1, -0.11, 0.52)),
+             ((-0.35, -0.1, -0.2), (-0.12, -0.08, 0.56))]
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def render(self, board, rvec, tvec):
+        """
+        Render a view of the board through the camera
+        """
+        image = board.generateImage(self.board_pixels)
+
+        r, _ = cv2.Rodrigues(np.array(rvec))
+        scale = np.diag([self.board_scale, self.board_scale, 1.0])
+        h = self.mtx @ np.column_stack((r[:, 0], r[:, 1], tvec)) @ scale
+        view = cv2.warpPerspective(image, h, self.imsize, borderValue=255)
+        return cv2.cvtColor(view, cv2.COLOR_GRAY2BGR)
+
+    def write_views(self):
+        calibration = CameraCalibration()
+        calibration.initializeForCalibration()
+
+        description = os.path.join(self._tmp.name, 'files.xml')
+        with open(description, 'w') as f:
+            f.write('<files>\n')
+            for i, (rvec, tvec) in enumerate(self.poses):
+                name = f'view{i}.png'
+                cv2.imwrite(os.path.join(self._tmp.name, name), self.render(calibration._board, rvec, tvec))
+                f.write(f'<file>{name}</file>\n')
+            f.write('</files>\n')
+
+        return description
+
+    def test_parallel_files(self):
+        description = self.write_views()
+
+        sequential = CameraCalibration()
+        sequential.initializeForCalibration()
+        for i in range(0, len(self.poses)):
+            sequential.frame(cv2.imread(os.path.join(self._tmp.name, f'view{i}.png')))
+
+        parallel = CameraCalibration()
+        parallel.initializeForCalibration()
+        parallel.args({'--projector': None, '--write': None, '--show': False, '--delay': None,
+                       '--invert': False, '--offset': None, '--camera': None,
+                       '--files': description, '--jobs': '2'})
+
+        self.assertEqual(len(parallel._allImagePoints), len(self.poses))
+        for a, b in zip(sequential._allImagePoints, parallel._allImagePoints):
+            self.assertTrue(np.array_equal(a, b))
+
+        # Parallel mode defers the solve to compute()
+        self.assertFalse(parallel.valid)
+        self.assertTrue(parallel.compute())
+        self.assertAlmostEqual(parallel.mtx[0][0] / 900.0, 1.0, 1)
+        self.assertAlmostEqual(parallel.mtx[1][1] / 900.0, 1.0, 1)
+
+
+    def test_async_compute(self):
+        self.write_views()
+
+        calibration = CameraCalibration()
+        calibration.initializeForCalibration()
+        calibration._async = True
+        for i in range(0, len(self.poses)):
+            calibration.frame(cv2.imread(os.path.join(self._tmp.name, f'view{i}.png')))
+
+        calibration._wait_compute()
+        self.assertTrue(calibration.valid)
+        self.assertEqual(len(calibration.rvecs), len(self.poses))
+        self.assertAlmostEqual(calibration.mtx[0][0] / 900.0, 1.0, 1)
+
+        # The final compute matches a synchronous solve
+        self.assertTrue(calibration.compute())
+        mtx = calibration.mtx
+
+        calibration._async = False
+        self.assertTrue(calibration.compute())
+        self.assertTrue(np.allclose(mtx, calibration.mtx))
+
+        # The worker ends when stopped
+        solver = calibration._solver
+        calibration._stop_solver()
+        self.assertFalse(solver.is_alive())
+        self.assertIsNone(calibration._solver)
+
+    def test_async_failure(self):
+        self.write_views()
+
+        calibration = CameraCalibration()
+        calibration.initializeForCalibration()
+        calibration._async = True
+
+        def fail(*args):
+            raise RuntimeError('publish failed')
+
+        calibration._publish = fail
+        for i in range(0, len(self.poses)):
+            calibration.frame(cv2.imread(os.path.join(self._tmp.name, f'view{i}.png')))
+
+        # A failed solve does not leave the worker marked as solving
+        waiter = threading.Thread(target=calibration._wait_compute, daemon=True)
+        waiter.start()
+        waiter.join(60)
+        self.assertFalse(waiter.is_alive())
+        self.assertFalse(calibration.valid)
+
+        # and the worker keeps serving requests
+        del calibration._publish
+        calibration._request_compute()
+        calibration._wait_compute()
+        self.assertTrue(calibration.valid)
+        calibration._stop_solver()
+
+    def test_view_selection(self):
+        self.write_views()
+        views = [cv2.imread(os.path.join(self._tmp.name, f'view{i}.png')) for i in range(0, len(self.poses))]
+
+        calibration = CameraCalibration()
+        calibration.initializeForCalibration()
+        calibration.view_budget = len(self.poses)
+
+        # Repeated near duplicate captures of the first view
+        for i in range(0, 4):
+            calibration.frame(views[0])
+        for view in views:
+            calibration.frame(view)
+
+        selected = calibration._select_views()
+        self.assertEqual(len(selected), len(self.poses))
+        self.assertEqual(selected[-1], len(self.poses) + 3)
+        self.assertEqual(len([i for i in selected if i < 4 or i == 4]), 1)
+
+        self.assertTrue(calibration.compute())
+        self.assertEqual(len(calibration.rvecs), len(self.poses))
+        self.assertEqual(sorted(calibration.view_errors.keys()), selected)
+        self.assertLess(max(calibration.view_errors.values()), 1.0)
+
+        # A corrupted capture is reported and dropped
+        rng = np.random.default_rng(3)
+        bad = selected[2]
+        calibration._allImagePoints[bad] = calibration._allImagePoints[bad] + rng.normal(0, 20, calibration._allImagePoints[bad].shape).astype(np.float32)
+        calibration.max_view_error = 2.0
+        self.assertTrue(calibration.compute())
+        self.assertEqual(len(calibration._allImagePoints), len(self.poses) + 3)
+        self.assertLess(max(calibration.view_errors.values()), 2.0)
+
+        # Identical captures, such as a frozen frame, are each selected once
+        calibration = CameraCalibration()
+        self.assertEqual(calibration.view_budget, 25)
+        calibration._allDescriptors = [np.ones(4)] * 6
+        calibration.view_budget = 4
+        self.assertEqual(calibration._select_views(), [0, 1, 2, 5])
+
+        # Every capture is used with no budget
+        calibration.view_budget = 0
+        self.assertIsNone(calibration.view_budget)
+        self.assertEqual(calibration._select_views(), list(range(0, 6)))
+
+    def test_pyramid(self):
+        self.write_views()
+
+        calibration = CameraCalibration()
+        calibration.pyramid_levels = 1
+        calibration.initializeForCalibration()
+        for i in range(0, len(self.poses)):
+            calibration.frame(cv2.imread(os.path.join(self._tmp.name, f'view{i}.png')))
+
+        self.assertEqual(len(calibration._allImagePoints), len(self.poses))
+        self.assertTrue(calibration.compute())
+        self.assertAlmostEqual(calibration.mtx[0][0] / 900.0, 1.0, 1)
+
+    def test_video(self):
+        calibration = CameraCalibration()
+        calibration.initializeForCalibration()
+
+        # Each pose is held for two blocks of ten frames, the first
+        # frame of each block is motion blurred
+        filename = os.path.join(self._tmp.name, 'sweep.avi')
+        writer = cv2.VideoWriter(filename, cv2.VideoWriter_fourcc(*'MJPG'), 30, self.imsize)
+        for rvec, tvec in self.poses:
+            view = self.render(calibration._board, rvec, tvec)
+            blurred = cv2.blur(view, (25, 1))
+            for i in range(0, 20):
+                writer.write(blurred if i % 10 == 0 else view)
+        writer.release()
+
+        calibration.args({'--projector': None, '--write': None, '--show': False, '--delay': None,
+                          '--invert': False, '--offset': None, '--camera': None, '--files': None,
+                          '--video': filename, '--stride': '5', '--min-sharpness': '800'})
+
+        self.assertEqual(len(calibration._allImagePoints), len(self.poses))
+        self.assertTrue(calibration.compute())
+        self.assertAlmostEqual(calibration.mtx[0][0] / 900.0, 1.0, 1)
+
+if __name__ == '__main__':
+    unittest.main()
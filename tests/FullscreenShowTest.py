@@ -0,0 +1,61 @@
+import sys
+import os
+
+# Add the parent directory of the current script to sys.path
+sys.path.append(os.path.abspath(os.path.join(__file__, os.pardir, os.pardir, os.pardir)))
+
+import unittest
+import numpy as np
+from abilities import FullscreenShow
+
+
+class FullscreenShowTest(unittest.TestCase):
+    def create(self):
+        fullscreen = FullscreenShow('projector', 1)
+        fullscreen._allocate(320, 240)
+
+        shown = []
+        fullscreen._is_open = True
+        fullscreen.imshow = lambda image: shown.append(image)
+        return fullscreen, shown
+
+    def test_cached_frames(self):
+        fullscreen, shown = self.create()
+
+        fullscreen.white()
+        fullscreen.white()
+        fullscreen.black()
+        self.assertIs(shown[0], shown[1])
+        self.assertEqual(shown[0].dtype, np.uint8)
+        self.assertEqual(shown[0].shape, (240, 320))
+        self.assertTrue(np.all(shown[0] == 255))
+        self.assertTrue(np.all(shown[2] == 0))
+
+    def test_buffer(self):
+        fullscreen, shown = self.create()
+
+        buffer = fullscreen.buffer(255)
+        self.assertEqual(buffer.dtype, np.uint8)
+        self.assertTrue(np.all(buffer == 255))
+
+        # Drawing is kept between calls
+        buffer[10, 20] = 0
+        self.assertIs(fullscreen.buffer(), buffer)
+        self.assertEqual(fullscreen.buffer()[10, 20], 0)
+
+        fullscreen.show_buffer()
+        self.assertIs(shown[0], buffer)
+
+        color = fullscreen.buffer((255, 0, 0), channels=3)
+        self.assertEqual(color.shape, (240, 320, 3))
+        self.assertTrue(np.all(color[:, :, 0] == 255))
+        self.assertTrue(np.all(color[:, :, 1:] == 0))
+
+        # The BGR buffer is shown, not replaced by a gray one
+        fullscreen.show_buffer()
+        self.assertIs(shown[1], color)
+        self.assertIs(fullscreen.buffer(channels=3), color)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,234 @@
+import sys
+import os
+
+# Add the parent directory of the current script to sys.path
+sys.path.append(os.path.abspath(os.path.join(__file__, os.pardir, os.pardir, os.pardir)))
+
+import unittest
+import tempfile
+import threading
+import time
+import cv2
+import numpy as np
+from abilities import GeneralCamera
+
+
+class ScriptedCamera(GeneralCamera):
+    """
+    Camera producing numbered frames, the device read fails after count frames
+    """
+
+    def __init__(self, count=None, hold=None, **kwargs):
+        """
+        :param count: Number of frames before the read fails, None for no limit
+        :param hold: Frame number the device read waits at until release() is called
+        """
+        super().__init__(**kwargs)
+        self._count = count
+        self._hold = hold
+        self._next = 0
+        self.held = threading.Event()
+        self._released = threading.Event()
+
+    def release(self):
+        self._released.set()
+
+    def _open(self):
+        self._source = 'scripted'
+        self._next = 0
+        return True
+
+    def _read_device(self, buffer=None):
+        if self._next == self._hold:
+            self.held.set()
+            self._released.wait()
+
+        if self._count is not None and self._next >= self._count:
+            return False, None
+
+        frame = np.full((2, 2), self._next, dtype=np.uint8)
+        self._next += 1
+        return True, frame
+
+
+class LiveCamera(GeneralCamera):
+    """
+    Live camera producing numbered frames where some grabs fail or raise,
+    every grab fails after count frames
+    """
+
+    def __init__(self, count, fail=(), error=(), **kwargs):
+        super().__init__(**kwargs)
+        self._count = count
+        self._fail = fail
+        self._error = error
+        self._next = 0
+
+    def _open(self):
+        self._source = 'live'
+        self._next = 0
+        return True
+
+    def _is_live(self):
+        return True
+
+    def _read_device(self, buffer=None):
+        i = self._next
+        self._next += 1
+        if i in self._error:
+            raise RuntimeError('Grab timed out')
+
+        if i in self._fail or i >= self._count:
+            time.sleep(0.001)
+            return False, None
+
+        return True, np.full((2, 2), i, dtype=np.uint8)
+
+
+class MovieCamera(GeneralCamera):
+    """
+    Camera reading a movie file through VideoCapture
+    """
+
+    def __init__(self, filename, **kwargs):
+        super().__init__(**kwargs)
+        self._filename = filename
+
+    def _open(self):
+        self._source = 'VideoCapture'
+        self._device = cv2.VideoCapture(self._filename)
+        return self._device.isOpened()
+
+
+class GeneralCameraTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+
+        # A short movie where each frame is a distinct gray level
+        self._movie = os.path.join(self._tmp.name, 'movie.avi')
+        writer = cv2.VideoWriter(self._movie, cv2.VideoWriter_fourcc(*'MJPG'), 30, (64, 48))
+        for i in range(0, 5):
+            writer.write(np.full((48, 64, 3), i * 40, dtype=np.uint8))
+        writer.release()
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def read_all(self, camera):
+        frames = []
+        while True:
+            ret, frame = camera.read()
+            if not ret:
+                return frames
+
+            frames.append(int(frame[0, 0]))
+
+    def test_every_frame(self):
+        camera = ScriptedCamera(count=20, threaded=True, latest=False, buffer_size=2)
+        self.assertTrue(camera.open())
+        self.assertTrue(camera.threaded)
+
+        # Acquisition waits for room, so every frame arrives in order
+        self.assertEqual(self.read_all(camera), list(range(0, 20)))
+        self.assertEqual(camera.dropped, 0)
+        self.assertIsNotNone(camera.timestamp)
+
+        # The failed read ended the stream
+        self.assertEqual(camera.read(), (False, None))
+        camera.close()
+
+    def test_latest_frame(self):
+        camera = ScriptedCamera(count=10, hold=6, threaded=True, latest=True, buffer_size=4)
+        self.assertTrue(camera.open())
+        self.assertTrue(camera.held.wait(5))
+
+        # Frames 0 to 5 were acquired, 0 and 1 were pushed out of the ring buffer
+        # and 2 to 4 are discarded when the newest frame is read
+        ret, frame = camera.read()
+        self.assertTrue(ret)
+        self.assertEqual(int(frame[0, 0]), 5)
+        self.assertEqual(camera.dropped, 5)
+
+        camera.release()
+        frames = self.read_all(camera)
+        self.assertTrue(all(6 <= f < 10 for f in frames))
+        self.assertEqual(frames, sorted(frames))
+        self.assertEqual(camera.read(), (False, None))
+        camera.close()
+
+    def test_live_failures(self):
+        # Failed grabs from a live camera are skipped, acquisition continues
+        camera = LiveCamera(10, fail=(2, 3), error=(5,), threaded=True, latest=False)
+        self.assertTrue(camera.open())
+
+        frames = [int(camera.read()[1][0, 0]) for i in range(0, 7)]
+        self.assertEqual(frames, [0, 1, 4, 6, 7, 8, 9])
+        self.assertGreaterEqual(camera.failed, 3)
+        self.assertEqual(camera.dropped, 0)
+        camera.close()
+
+    def test_close(self):
+        # Acquisition is waiting for room in the buffer when the camera is closed
+        camera = ScriptedCamera(threaded=True, latest=False, buffer_size=1)
+        self.assertTrue(camera.open())
+        ret, frame = camera.read()
+        self.assertTrue(ret)
+
+        thread = camera._thread
+        camera.close()
+        self.assertFalse(thread.is_alive())
+        self.assertIsNone(camera._thread)
+
+        # The camera can be opened again
+        self.assertTrue(camera.open())
+        self.assertEqual(int(camera.read()[1][0, 0]), 0)
+        camera.close()
+
+    def test_read_into(self):
+        camera = MovieCamera(self._movie)
+        self.assertTrue(camera.open())
+        buffer = camera.create_buffer()
+        self.assertEqual(buffer.shape, (48, 64, 3))
+
+        # VideoCapture decodes straight into the buffer
+        self.assertTrue(camera.zero_copy)
+        for i in range(1, 5):
+            ret, frame = camera.read_into(buffer)
+            self.assertTrue(ret)
+            self.assertIs(frame, buffer)
+            self.assertAlmostEqual(float(buffer.mean()), i * 40, delta=3)
+
+        self.assertFalse(camera.read_into(buffer)[0])
+        camera.close()
+
+        # A buffer that does not match the frames
+        camera = MovieCamera(self._movie)
+        self.assertTrue(camera.open())
+        with self.assertRaises(ValueError):
+            camera.read_into(np.empty((48, 64), dtype=np.uint8))
+        camera.close()
+
+    def test_threaded_read_into(self):
+        camera = MovieCamera(self._movie, threaded=True, latest=False)
+        self.assertTrue(camera.open())
+        self.assertFalse(camera.zero_copy)
+
+        buffer = np.empty((48, 64, 3), dtype=np.uint8)
+        for i in range(0, 5):
+            ret, frame = camera.read_into(buffer)
+            self.assertTrue(ret)
+            self.assertIs(frame, buffer)
+            self.assertAlmostEqual(float(buffer.mean()), i * 40, delta=3)
+
+        self.assertFalse(camera.read_into(buffer)[0])
+        camera.close()
+
+        # A buffer that does not match the frames
+        self.assertTrue(camera.open())
+        with self.assertRaises(ValueError):
+            camera.read_into(np.empty((24, 32, 3), dtype=np.uint8))
+        camera.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import sys
+import os
+
+# Add the parent directory of the current script to sys.path
+sys.path.append(os.path.abspath(os.path.join(__file__, os.pardir, os.pardir, os.pardir)))
+
+import unittest
+import cv2
+import numpy as np
+from abilities import Calibration, MarkerTracker
+
+
+class MarkerTrackerTest(unittest.TestCase):
+    mtx = np.array([[900.0, 0, 640], [0, 900.0, 480], [0, 0, 1]])
+    dist = np.array([[0.05, -0.1, 0.001, -0.002, 0.02]])
+
+    def create(self):
+        calibration = Calibration()
+        calibration.set((1280, 960), self.mtx, self.dist)
+        return MarkerTracker(calibration, 0.06)
+
+    def test_estimate(self):
+        tracker = self.create()
+        rng = np.random.default_rng(4)
+
+        rvecs = rng.uniform(-0.4, 0.4, (12, 3)) + (np.pi, 0, 0)
+        tvecs = np.column_stack((rng.uniform(-0.2, 0.2, (12, 2)), rng.uniform(0.5, 1.0, 12)))
+        ids = np.arange(12).reshape(-1, 1)
+
+        for frame in range(0, 3):
+            # Markers move a little each frame
+            tvecs = tvecs + (0.002, 0, 0)
+            corners = []
+            for rvec, tvec in zip(rvecs, tvecs):
+                projected, _ = cv2.projectPoints(tracker.obj_points, rvec, tvec, self.mtx, self.dist)
+                corners.append(projected.reshape(1, 4, 2).astype(np.float32))
+
+            poses = tracker.estimate(corners, ids)
+            self.assertEqual(sorted(poses.keys()), list(range(0, 12)))
+            for i in range(0, 12):
+                self.assertTrue(np.allclose(poses[i].tvec.ravel(), tvecs[i], atol=1e-3))
+                self.assertLess(poses[i].error, 0.1)
+
+        # The first frame is solved, later frames tracked from the previous pose
+        self.assertEqual(tracker.solved, 12)
+        self.assertEqual(tracker.tracked, 24)
+
+        # Markers not seen are forgotten
+        tracker.estimate([], None)
+        tracker.estimate([], None)
+        self.assertEqual(len(tracker._poses), 0)
+
+        # A previous pose whose nearest solution does not fit is not counted as tracked
+        tracker._max_error = -1.0
+        tracker.estimate(corners, ids)
+        tracker.estimate(corners, ids)
+        self.assertEqual(tracker.solved, 36)
+        self.assertEqual(tracker.tracked, 24)
+
+    def test_track(self):
+        tracker = self.create()
+
+        # Render a marker through the camera without distortion
+        tracker._calibration.set((1280, 960), self.mtx, None)
+        marker = cv2.aruco.generateImageMarker(tracker._dictionary, 7, 600)
+        image = np.full((800, 800), 255, dtype=np.uint8)
+        image[100:700, 100:700] = marker
+
+        # Image pixels to marker coordinates (x right, y up, centred), 0.06m across the marker
+        s = 0.06 / 600
+        to_marker = np.array([[s, 0, -400 * s], [0, -s, 400 * s], [0, 0, 1]])
+        rvec = np.array([np.pi + 0.2, 0.1, 0.0])
+        tvec = np.array([0.02, -0.01, 0.5])
+        r, _ = cv2.Rodrigues(rvec)
+        h = self.mtx @ np.column_stack((r[:, 0], r[:, 1], tvec)) @ to_marker
+        frame = cv2.warpPerspective(image, h, (1280, 960), borderValue=255)
+
+        poses = tracker.track(frame)
+        self.assertEqual(list(poses.keys()), [7])
+        self.assertTrue(np.allclose(poses[7].tvec.ravel(), tvec, atol=0.01))
+        r_found, _ = cv2.Rodrigues(poses[7].rvec)
+        self.assertTrue(np.allclose(r_found, r, atol=0.05))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+import sys
+import os
+
+# Add the parent directory of the current script to sys.path
+sys.path.append(os.path.abspath(os.path.join(__file__, os.pardir, os.pardir, os.pardir)))
+
+import unittest
+import threading
+import numpy as np
+from abilities import MultiCamera, FrameSetMatcher
+
+
+class FakeCamera:
+    """
+    Camera returning numbered frames with preset timestamps
+    """
+
+    def __init__(self, timestamps):
+        self._timestamps = list(timestamps)
+        self._index = -1
+        self._release = threading.Semaphore(0)
+        self.opened = False
+
+    def open(self):
+        self.opened = True
+        return True
+
+    def close(self):
+        self.opened = False
+
+    def step(self, count=1):
+        """
+        Allow count more frames to be read
+        """
+        for i in range(0, count):
+            self._release.release()
+
+    def read(self):
+        self._release.acquire()
+        self._index += 1
+        if self._index >= len(self._timestamps):
+            return False, None
+
+        return True, np.full((2, 2), self._index, dtype=np.uint8)
+
+    @property
+    def timestamp(self):
+        return self._timestamps[self._index]
+
+
+class MultiCameraTest(unittest.TestCase):
+    def test_matcher(self):
+        matcher = FrameSetMatcher(2, tolerance=0.002)
+
+        # Camera 0 at 10 ms intervals, camera 1 with jitter and a missing frame at 0.02
+        for i, t in enumerate([0.000, 0.010, 0.020, 0.030]):
+            matcher.put(0, t, ('a', i))
+        for i, t in enumerate([0.001, 0.0095, 0.0315]):
+            matcher.put(1, t, ('b', i))
+
+        timestamps, frames = matcher.get(0)
+        self.assertEqual(frames, [('a', 0), ('b', 0)])
+        self.assertEqual(timestamps, [0.000, 0.001])
+
+        timestamps, frames = matcher.get(0)
+        self.assertEqual(frames, [('a', 1), ('b', 1)])
+
+        # Camera 0 frame at 0.02 has no partner and is dropped
+        timestamps, frames = matcher.get(0)
+        self.assertEqual(frames, [('a', 3), ('b', 2)])
+        self.assertEqual(matcher.dropped, 1)
+        self.assertEqual(matcher.matched, 3)
+
+        # Nothing left to match
+        self.assertEqual(matcher.get(0.01), (None, None))
+
+        # Frames further apart than the tolerance are never matched
+        matcher.put(0, 0.040, 'a')
+        matcher.put(1, 0.043, 'b')
+        self.assertEqual(matcher.get(0), (None, None))
+        self.assertEqual(matcher.dropped, 2)
+
+        matcher.close()
+        self.assertEqual(matcher.get(), (None, None))
+
+    def test_matcher_queue_size(self):
+        matcher = FrameSetMatcher(2, tolerance=0.001, size=2)
+        for i in range(0, 5):
+            matcher.put(0, i * 0.01, i)
+
+        matcher.put(1, 0.04, 'b')
+        timestamps, frames = matcher.get(0)
+        self.assertEqual(frames, [4, 'b'])
+        self.assertEqual(matcher.dropped, 4)
+
+    def test_read(self):
+        cameras = [FakeCamera([1.0, 2.0, 3.0]), FakeCamera([1.001, 1.5, 2.002, 2.999])]
+        multi = MultiCamera(cameras, tolerance=0.005, timeout=1.0)
+        self.assertTrue(multi.open())
+        self.assertEqual(multi.source, 'arrival')
+        self.assertEqual(multi.count, 2)
+        self.assertTrue(all(camera.opened for camera in cameras))
+
+        cameras[0].step(3)
+        cameras[1].step(4)
+
+        expected = [([1.0, 1.001], [0, 0]), ([2.0, 2.002], [1, 2]), ([3.0, 2.999], [2, 3])]
+        for timestamps, indices in expected:
+            ret, frames = multi.read()
+            self.assertTrue(ret)
+            self.assertEqual(multi.timestamps, timestamps)
+            self.assertEqual([int(frame[0, 0]) for frame in frames], indices)
+
+        self.assertEqual(multi.dropped, 1)
+
+        # The first camera running out of frames ends acquisition
+        cameras[0].step()
+        ret, frames = multi.read()
+        self.assertFalse(ret)
+        self.assertIsNone(frames)
+
+        cameras[1].step()
+        multi.close()
+        self.assertFalse(any(camera.opened for camera in cameras))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+import sys
+import os
+
+# Add the parent directory of the current script to sys.path
+sys.path.append(os.path.abspath(os.path.join(__file__, os.pardir, os.pardir, os.pardir)))
+
+import unittest
+import tempfile
+import cv2
+import numpy as np
+from abilities import ProjectorCalibration
+
+
+class ProjectorCalibrationTest(unittest.TestCase):
+    def __init__(self, methodName='runTest'):
+        super().__init__(methodName)
+        self._dir = os.path.dirname(os.path.abspath(__file__))
+
+    def create(self, surfaces):
+        calibration = ProjectorCalibration()
+        calibration._camera_calibration.read(self._dir + "/data/calibration.yaml.dat")
+        calibration._surfaces = surfaces
+        return calibration
+
+    def test_compute_calibration(self):
+        calibration = self.create([[[0, 0, 0], [520, 0, 0], [520, 520, 0], [0, 520, 0]]])
+
+        # Markers on the z=0 plane as seen by the camera
+        rng = np.random.default_rng(5)
+        world = []
+        corners = []
+        ids = []
+        for id in range(10, 30):
+            x, y = rng.uniform(-0.05, 0.05, 2)
+            marker = np.array([[x, y, 0], [x + 0.01, y, 0], [x + 0.01, y + 0.01, 0], [x, y + 0.01, 0]])
+            world.append(marker)
+            corners.append(calibration._camera_calibration.project_many(marker).reshape(1, 4, 2).astype(np.float32))
+            ids.append(np.array([id]))
+            calibration._projected_corners[id] = (marker[:, 0:2] * 10000).tolist()
+
+        # An id that was not projected is ignored
+        corners.append(corners[0])
+        ids.append(np.array([5]))
+
+        captured = {}
+
+        def compute2d(world_points, image_points):
+            captured['world'] = world_points
+            captured['image'] = image_points
+            return True
+
+        calibration._compute_calibration2d = compute2d
+        self.assertTrue(calibration._compute_calibration([corners], [ids]))
+
+        world = np.concatenate(world)
+        self.assertEqual(captured['world'].shape, (len(world), 3))
+        self.assertTrue(np.allclose(captured['world'], world, atol=1e-4))
+        self.assertTrue(np.allclose(captured['image'], world[:, 0:2] * 10000))
+
+    def test_surface_labels(self):
+        calibration = self.create([[[-50, -50, 0], [0, -50, 0], [0, 50, 0], [-50, 50, 0]],
+                                   [[-10, -50, 0], [50, -50, 0], [50, 50, 0], [-10, 50, 0]]])
+        labels = calibration._surface_labels(960, 1280)
+        self.assertIs(labels, calibration._surface_labels(960, 1280))
+
+        # The mask agrees with a point in polygon test away from the edges
+        rng = np.random.default_rng(7)
+        for u, v in rng.uniform(0, [1280, 960], (500, 2)).astype(np.int32):
+            for s, polygon in enumerate(calibration._projected_surfaces()):
+                distance = cv2.pointPolygonTest(np.array(polygon, dtype=np.int32), (int(u), int(v)), True)
+                if abs(distance) > 1:
+                    self.assertEqual(bool(labels[v, u] & (1 << s)), distance > 0)
+
+        # Markers are assigned to every surface containing all four corners
+        def marker(x, y):
+            points = np.array([[x, y, 0], [x + 0.005, y, 0], [x + 0.005, y + 0.005, 0], [x, y + 0.005, 0]])
+            return calibration._camera_calibration.project_many(points).reshape(1, 4, 2).astype(np.float32)
+
+        corners = (marker(-0.04, 0), marker(-0.007, 0), marker(0.03, 0), marker(-0.002, 0))
+        ids = np.array([[1], [2], [3], [4]], dtype=np.int32)
+
+        class Detector:
+            def detectMarkers(self, frame):
+                return corners, ids, ()
+
+        calibration._detector = Detector()
+
+        frame = np.zeros((960, 1280, 3), dtype=np.uint8)
+        surfacesCorners, surfacesIds = calibration._detect_markers(frame)
+        self.assertEqual([int(i[0]) for i in surfacesIds[0]], [1, 2])
+        self.assertEqual([int(i[0]) for i in surfacesIds[1]], [2, 3, 4])
+        self.assertEqual(len(surfacesCorners[1]), 3)
+
+    def test_draw_on_frame(self):
+        calibration = self.create([[[-50, -50, 0], [50, -50, 0], [50, 50, 0], [-50, 50, 0]]])
+
+        rng = np.random.default_rng(11)
+        frame = rng.integers(0, 256, (960, 1280, 3), dtype=np.uint8)
+
+        # Compositing the cached overlay matches drawing directly
+        expected = frame.copy()
+        calibration._render_overlay(expected)
+        self.assertTrue(np.array_equal(calibration._draw_on_frame(frame.copy()), expected))
+
+        overlay = calibration._overlay(frame.shape)
+        self.assertIs(overlay, calibration._overlay(frame.shape))
+
+        calibration._invalidate_surfaces()
+        self.assertIsNot(overlay, calibration._overlay(frame.shape))
+
+    def test_create_image(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            calibration = ProjectorCalibration()
+            calibration._marker_cache = tmp
+
+            image, corners = calibration._create_image(640, 480, 50, [12])
+            self.assertEqual(image.dtype, np.uint8)
+            self.assertEqual(image.shape, (480, 640))
+            self.assertNotIn(12, corners)
+            self.assertEqual(len(os.listdir(tmp)), 1)
+
+            # The markers are found where the corner table says
+            found, ids, _ = calibration._detector.detectMarkers(image)
+            self.assertEqual(sorted(int(i) for i in ids.flatten()), sorted(corners.keys()))
+
+            # A second call reads the cache
+            calibration._generate_image = None
+            cached_image, cached_corners = calibration._create_image(640, 480, 50, [12])
+            self.assertTrue(np.array_equal(image, cached_image))
+            self.assertEqual(corners, cached_corners)
+
+
+if __name__ == '__main__':
+    unittest.main()
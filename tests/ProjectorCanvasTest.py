@@ -0,0 +1,79 @@
+import sys
+import os
+
+# Add the parent directory of the current script to sys.path
+sys.path.append(os.path.abspath(os.path.join(__file__, os.pardir, os.pardir, os.pardir)))
+
+import unittest
+import cv2
+import numpy as np
+from abilities import Calibration, ProjectorCanvas
+
+
+class ProjectorCanvasTest(unittest.TestCase):
+    size = (640, 480)
+    extent = (0, 0, 400, 300)
+
+    def calibration2d(self):
+        calibration = Calibration()
+        calibration.set(self.size, np.array([[1400.0, 60, 20], [-40, 1450, 10], [0.05, 0.1, 1]]))
+        return calibration
+
+    def calibration3d(self):
+        calibration = Calibration()
+        mtx = np.array([[700.0, 0, 320], [0, 700, 240], [0, 0, 1]])
+        dist = np.array([[0.05, -0.02, 0.001, 0.002, 0.0]])
+        rvec = np.array([[0.1], [-0.05], [0.02]])
+        tvec = np.array([[-0.2], [-0.15], [0.6]])
+        calibration.set(self.size, mtx, dist, [rvec], [tvec])
+        return calibration
+
+    def draw(self, canvas):
+        canvas.clear((40, 40, 40))
+        canvas.line((20, 20), (380, 280), (0, 0, 255), 3)
+        canvas.circle((200, 100), 30, (0, 255, 0), -1)
+
+    def test_homography(self):
+        calibration = self.calibration2d()
+        canvas = ProjectorCanvas(calibration, self.size, self.extent, resolution=0.5)
+        self.draw(canvas)
+
+        output = canvas.render()
+        expected = cv2.warpPerspective(canvas.image, canvas._canvas_homography(), self.size)
+        self.assertEqual(np.count_nonzero(np.abs(output.astype(int) - expected) > 1), 0)
+
+        # A point drawn in the canvas appears where the calibration projects it
+        u, v = calibration.project2d(0.2, 0.1)
+        self.assertTrue(np.array_equal(output[int(round(v)), int(round(u))], (0, 255, 0)))
+
+        # Nothing changed, nothing is warped
+        canvas.render()
+        self.assertEqual(canvas.renders, 1)
+
+        # Only the changed region is warped again, with the same result as a full warp
+        canvas.polylines([(300, 50), (350, 60), (340, 120)], (255, 255, 255), True, 2)
+        self.assertLess(canvas._output_rect(canvas._dirty)[2] - canvas._output_rect(canvas._dirty)[0], self.size[0])
+        output = canvas.render()
+        expected = cv2.warpPerspective(canvas.image, canvas._canvas_homography(), self.size)
+        self.assertEqual(canvas.renders, 2)
+        self.assertEqual(np.count_nonzero(np.abs(output.astype(int) - expected) > 1), 0)
+
+    def test_remap(self):
+        calibration = self.calibration3d()
+        canvas = ProjectorCanvas(calibration, self.size, self.extent, resolution=0.5)
+        self.assertTrue(canvas.is_3d)
+        self.draw(canvas)
+        canvas.render()
+
+        u, v = calibration.project_many([[0.2, 0.1, 0.0]])[0]
+        self.assertTrue(np.array_equal(canvas.output[int(round(v)), int(round(u))], (0, 255, 0)))
+
+        # A partial render matches rendering everything again
+        canvas.circle((100, 220), 20, (255, 0, 0), -1)
+        partial = canvas.render().copy()
+        canvas.mark_dirty()
+        self.assertTrue(np.array_equal(partial, canvas.render()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import sys
+import os
+
+# Add the parent directory of the current script to sys.path
+sys.path.append(os.path.abspath(os.path.join(__file__, os.pardir, os.pardir, os.pardir)))
+
+import unittest
+import cv2
+import numpy as np
+from abilities import PyramidDetector
+from abilities.cameracalibration import _create_board
+
+
+class PyramidDetectorTest(unittest.TestCase):
+    # Board image pixel size in meters
+    scale = 0.25 / 2000
+
+    def render(self, board):
+        """
+        Render a view of the board at 2560x1920
+        :return: view, homography from board image pixels to the view
+        """
+        image = board.generateImage((2000, 1600))
+        mtx = np.array([[1800.0, 0, 1280], [0, 1800.0, 960], [0, 0, 1]])
+        r, _ = cv2.Rodrigues(np.array([0.3, -0.2, 0.05]))
+        h = mtx @ np.column_stack((r[:, 0], r[:, 1], (-0.12, -0.1, 0.55))) @ np.diag([self.scale, self.scale, 1])
+        view = cv2.warpPerspective(image, h, (2560, 1920), flags=cv2.INTER_AREA, borderValue=255)
+        return cv2.GaussianBlur(view, (0, 0), 1.0), h
+
+    def error(self, h, corners, points):
+        """
+        RMS error of detected corners from their true positions
+        :param points: Board coordinates of the corners
+        """
+        truth = np.asarray(points).reshape(-1, 3)[:, 0:2] / self.scale - 0.5
+        truth = np.column_stack((truth, np.ones(len(truth)))) @ h.T
+        truth = truth[:, 0:2] / truth[:, 2:3]
+        return np.sqrt(np.mean(np.sum((corners.reshape(-1, 2) - truth) ** 2, axis=1)))
+
+    def test_detect_board(self):
+        _, board, detector = _create_board()
+        view, h = self.render(board)
+
+        corners, ids, markerCorners, markerIds = detector.detectBoard(view)
+        error = self.error(h, corners, board.getChessboardCorners()[ids.ravel()])
+        self.assertLess(error, 0.5)
+
+        # Corners are found no less accurately
+        for levels in [1, 2]:
+            pyramid = PyramidDetector(detector, levels)
+            pyramid_corners, pyramid_ids, pyramid_marker_corners, pyramid_marker_ids = pyramid.detectBoard(view)
+
+            # At the coarser level the smallest markers are too small to be found
+            if levels == 1:
+                self.assertTrue(np.array_equal(np.sort(ids.ravel()), np.sort(pyramid_ids.ravel())))
+            else:
+                self.assertTrue(set(pyramid_ids.ravel()).issubset(set(ids.ravel())))
+                self.assertGreater(len(pyramid_ids), len(ids) * 0.8)
+
+            self.assertLess(self.error(h, pyramid_corners, board.getChessboardCorners()[pyramid_ids.ravel()]), error + 0.02)
+
+    def test_detect_markers(self):
+        dictionary, board, detector = _create_board()
+        view, h = self.render(board)
+        view = cv2.cvtColor(view, cv2.COLOR_GRAY2BGR)
+
+        full = cv2.aruco.ArucoDetector(dictionary, detector.getDetectorParameters())
+        corners, ids, rejected = full.detectMarkers(view)
+        pyramid_corners, pyramid_ids, pyramid_rejected = PyramidDetector(full, 1).detectMarkers(view)
+
+        self.assertTrue(np.array_equal(np.sort(ids.ravel()), np.sort(pyramid_ids.ravel())))
+        self.assertEqual(pyramid_corners[0].shape, (1, 4, 2))
+
+        # Marker corners refined at full resolution are more accurate than unrefined ones
+        marker_points = dict(zip(board.getIds(), board.getObjPoints()))
+        error = self.error(h, np.concatenate(corners), [marker_points[int(i)] for i in ids.ravel()])
+        pyramid_error = self.error(h, np.concatenate(pyramid_corners), [marker_points[int(i)] for i in pyramid_ids.ravel()])
+        self.assertLess(pyramid_error, error)
+
+        # Board detection needs a CharucoDetector
+        for levels in [0, 1]:
+            with self.assertRaises(TypeError):
+                PyramidDetector(full, levels).detectBoard(view)
+
+        # Level 0 passes board detection straight through
+        corners, ids, _, _ = PyramidDetector(detector, 0).detectBoard(view)
+        self.assertGreater(len(ids), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
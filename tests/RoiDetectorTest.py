@@ -0,0 +1,62 @@
+import sys
+import os
+
+# Add the parent directory of the current script to sys.path
+sys.path.append(os.path.abspath(os.path.join(__file__, os.pardir, os.pardir, os.pardir)))
+
+import unittest
+import cv2
+import numpy as np
+from abilities import RoiDetector
+
+
+def render_markers(dictionary, positions, size=(1920, 1080), marker_size=120):
+    """
+    Render markers at positions on a gray background
+    :param positions: Dictionary of marker id to top left corner
+    """
+    frame = np.full((size[1], size[0]), 200, dtype=np.uint8)
+    for marker_id, (x, y) in positions.items():
+        marker = cv2.aruco.generateImageMarker(dictionary, marker_id, marker_size)
+        border = marker_size // 6
+        frame[y - border:y + marker_size + border, x - border:x + marker_size + border] = 255
+        frame[y:y + marker_size, x:x + marker_size] = marker
+
+    return frame
+
+
+class RoiDetectorTest(unittest.TestCase):
+    def test_matches_full_scan(self):
+        dictionary = cv2.aruco.getPredefinedDictionary(cv2.aruco.DICT_4X4_50)
+        full = cv2.aruco.ArucoDetector(dictionary, cv2.aruco.DetectorParameters())
+        detector = RoiDetector(cv2.aruco.ArucoDetector(dictionary, cv2.aruco.DetectorParameters()), rescan=10)
+
+        for frame_number in range(0, 30):
+            # Markers move at different speeds, marker 5 appears at frame 12
+            # and marker 3 disappears at frame 20
+            positions = {1: (100 + 7 * frame_number, 100), 2: (900, 200 + 5 * frame_number)}
+            if frame_number >= 12:
+                positions[5] = (1500, 700)
+            if frame_number < 20:
+                positions[3] = (400 + 3 * frame_number, 600 + 2 * frame_number)
+
+            frame = render_markers(dictionary, positions)
+            expected_corners, expected_ids, _ = full.detectMarkers(frame)
+            corners, ids, _ = detector.detectMarkers(frame)
+
+            # New markers are found at the next rescan
+            expected = {int(i): c for c, i in zip(expected_corners, expected_ids.reshape(-1))}
+            if 12 <= frame_number < 20:
+                del expected[5]
+
+            found = {int(i): c for c, i in zip(corners, ids.reshape(-1))}
+            self.assertEqual(sorted(found.keys()), sorted(expected.keys()))
+            for marker_id in expected:
+                self.assertTrue(np.allclose(found[marker_id], expected[marker_id], atol=1e-3))
+
+        self.assertGreater(detector.roi_scans, 20)
+        self.assertLess(detector.scanned, 30 * 1920 * 1080 / 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -22,3 +22,20 @@ class StreamerConfigTest(unittest.TestCase):
         config = StreamerConfig({}, self._dir + "/data/config2.json")
         expected = {'camera-calibration': 'trial1.yaml', 'movie': 'trial1.mp4', 'region': {'a': 7, 'y-range-fm-mm': -15, 'y-range-to-mm': 5, 'x-range-fm-mm': -30, 'x-range-to-mm': -7}, 'background': {'sample': [120]}, 'zoom': 0.5}
         self.assertDictEqual(expected, config.config)
+
+    def test_headless(self):
+        config = StreamerConfig({}, self._dir + "/data/config1.json")
+        self.assertFalse(config.headless)
+        self.assertIsNone(config.keys)
+
+        config = StreamerConfig({'--headless': True, '--keys': '10:q'}, self._dir + "/data/config1.json")
+        self.assertTrue(config.headless)
+        self.assertEqual(config.keys, '10:q')
+
+    def test_camera_threaded(self):
+        config = StreamerConfig({}, self._dir + "/data/config1.json")
+        self.assertFalse(config.camera_threaded)
+        self.assertTrue(config.camera_latest)
+
+        config = StreamerConfig({'--camera-threaded': True}, self._dir + "/data/config1.json")
+        self.assertTrue(config.camera_threaded)
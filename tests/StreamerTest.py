@@ -0,0 +1,191 @@
+import sys
+import os
+
+# Add the parent directory of the current script to sys.path
+sys.path.append(os.path.abspath(os.path.join(__file__, os.pardir, os.pardir, os.pardir)))
+
+import unittest
+import tempfile
+import json
+import time
+import cv2
+import numpy as np
+from abilities import Streamer, ScriptedKeySource, FrameQueue
+
+
+class RecordingStreamer(Streamer):
+    """
+    Streamer that records the frames and keys it is given
+    """
+    def __init__(self, docopt_args, delay=0):
+        super().__init__(docopt_args)
+        self.frames = []
+        self.frame_numbers = []
+        self.keys = []
+        self._delay = delay
+
+    def on_frame(self, frame):
+        self.frames.append(int(frame[0][0][0]))
+        self.frame_numbers.append(self.frame_number)
+        if self._delay > 0:
+            time.sleep(self._delay)
+
+    def on_key(self, key, frame):
+        if key != 0xff:
+            self.keys.append((self.frame_number, chr(key)))
+        return False
+
+
+class StreamerTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        dir = self._tmp.name
+
+        # A short movie where each frame is a distinct gray level
+        writer = cv2.VideoWriter(os.path.join(dir, 'movie.avi'), cv2.VideoWriter_fourcc(*'MJPG'), 30, (64, 48))
+        self._frames = 20
+        for i in range(0, self._frames):
+            writer.write(np.full((48, 64, 3), i * 10, dtype=np.uint8))
+        writer.release()
+
+        self._config = os.path.join(dir, 'config.json')
+        with open(self._config, 'w') as f:
+            json.dump({'movie': 'movie.avi', 'headless': True}, f)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_headless(self):
+        streamer = RecordingStreamer({'--config': self._config})
+        self.assertTrue(streamer.headless)
+        streamer.start()
+
+        self.assertEqual(streamer.frame_number, self._frames)
+        self.assertEqual(len(streamer.frames), self._frames)
+        self.assertTrue(np.allclose(streamer.frames, np.arange(0, self._frames) * 10, atol=3))
+
+    def test_scripted_keys(self):
+        streamer = RecordingStreamer({'--config': self._config, '--keys': '3:p,3:x,3:p,8:q'})
+        streamer.pause_key = 'p'
+        streamer.start()
+
+        self.assertEqual(streamer.keys, [(3, 'p'), (3, 'x'), (3, 'p'), (8, 'q')])
+        self.assertEqual(streamer.frame_number, 8)
+
+    def test_pipeline(self):
+        for keys in [None, '8:q']:
+            streamer = RecordingStreamer({'--config': self._config, '--keys': keys, '--pipeline': True})
+            self.assertTrue(streamer.config.pipeline)
+            streamer.start()
+
+            expected = self._frames if keys is None else 8
+            self.assertEqual(streamer.frame_number, expected)
+            self.assertTrue(np.allclose(streamer.frames, np.arange(0, expected) * 10, atol=3))
+
+    def test_every_nth(self):
+        for pipeline in [False, True]:
+            streamer = RecordingStreamer({'--config': self._config, '--pipeline': pipeline,
+                                          '--overflow': 'every-nth', '--every': '3'})
+            streamer.start()
+
+            self.assertEqual(streamer.frame_numbers, list(range(1, self._frames + 1, 3)))
+            self.assertTrue(np.allclose(streamer.frames, (np.array(streamer.frame_numbers) - 1) * 10, atol=3))
+            self.assertEqual(streamer.frames_processed, len(streamer.frame_numbers))
+            self.assertEqual(streamer.frames_processed + streamer.frames_dropped, self._frames)
+
+    def test_drop_oldest(self):
+        streamer = RecordingStreamer({'--config': self._config, '--pipeline': True,
+                                      '--overflow': 'drop-oldest'}, delay=0.01)
+        streamer.config.queue_size = 1
+        streamer.start()
+
+        # The last frame is never dropped and frames stay in order
+        self.assertEqual(streamer.frame_numbers[-1], self._frames)
+        self.assertEqual(streamer.frame_numbers, sorted(streamer.frame_numbers))
+        self.assertEqual(streamer.frames_processed + streamer.frames_dropped, self._frames)
+
+    def test_instrument(self):
+        streamer = RecordingStreamer({'--config': self._config})
+        streamer.start()
+        self.assertIsNone(streamer.stats)
+
+        filename = os.path.join(self._tmp.name, 'timing.jsonl')
+        streamer = RecordingStreamer({'--config': self._config, '--instrument-file': filename}, delay=0.002)
+        streamer.start()
+
+        stats = streamer.stats
+        for stage in ['read', 'on_frame', 'keys', 'latency']:
+            self.assertEqual(stats['stages'][stage]['count'], self._frames)
+
+        self.assertGreaterEqual(stats['stages']['on_frame']['min_ms'], 2)
+        self.assertGreater(stats['fps'], 0)
+
+        with open(filename) as f:
+            lines = [json.loads(line) for line in f]
+        self.assertEqual(lines[-1]['stages']['on_frame']['count'], self._frames)
+
+    def test_capture_time(self):
+        class Device:
+            """
+            Device whose frames were acquired 50 ms before they are read
+            """
+            timestamp = None
+
+            def read(self):
+                self.timestamp = time.perf_counter() - 0.05
+                return True, np.zeros((4, 4, 3), dtype=np.uint8)
+
+        class SlowCapture:
+            """
+            VideoCapture like device with no timestamp that takes 20 ms to read
+            """
+            def read(self):
+                time.sleep(0.02)
+                return True, np.zeros((4, 4, 3), dtype=np.uint8)
+
+        for pipeline in [False, True]:
+            streamer = RecordingStreamer({'--config': self._config, '--pipeline': pipeline})
+            streamer._running = True
+
+            # The device timestamp is the capture time
+            device = Device()
+            frames = streamer._pipelined_frames(device) if pipeline else streamer._frames(device)
+            frame_number, frame, capture_time = next(frames)
+            self.assertLess(capture_time, time.perf_counter() - 0.05)
+            frames.close()
+
+            # otherwise the time the read started
+            frames = streamer._pipelined_frames(SlowCapture()) if pipeline else streamer._frames(SlowCapture())
+            frame_number, frame, capture_time = next(frames)
+            self.assertLess(capture_time, time.perf_counter() - 0.02)
+            frames.close()
+
+    def test_frame_queue(self):
+        frames = FrameQueue(2, FrameQueue.DROP_NEWEST)
+        for i in range(0, 4):
+            frames.put(i)
+        frames.close()
+        self.assertEqual([frames.get(), frames.get(), frames.get()], [0, 1, None])
+        self.assertEqual(frames.dropped, 2)
+        self.assertEqual(frames.processed, 2)
+
+        frames = FrameQueue(2, FrameQueue.DROP_OLDEST)
+        for i in range(0, 4):
+            frames.put(i)
+        self.assertEqual([frames.get(), frames.get()], [2, 3])
+        self.assertEqual(frames.dropped, 2)
+
+        with self.assertRaises(ValueError):
+            FrameQueue(2, 'unknown')
+
+    def test_key_source(self):
+        keys = ScriptedKeySource('5:a,2:b')
+        self.assertEqual(keys.poll(1), 0xff)
+        self.assertEqual(keys.poll(2), ord('b'))
+        self.assertEqual(keys.poll(3), 0xff)
+        self.assertEqual(keys.poll(3, block=True), ord('a'))
+        self.assertEqual(keys.poll(4, block=True), 0xff)
+
+
+if __name__ == '__main__':
+    unittest.main()